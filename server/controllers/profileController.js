@@ -311,6 +311,7 @@ exports.deleteProfile = async (req, res) => {
 
 const { spawn } = require('child_process');
 const path = require('path');
+const { callModelServer, ModelServerBusyError } = require('../services/modelServerClient');
 
 // MODEL 2: Predict Career Cluster for specific user (REAL ML VERSION with CORRECT MongoDB save)
 exports.predictCareerCluster = async (req, res) => {
@@ -347,6 +348,92 @@ exports.predictCareerCluster = async (req, res) => {
     
     console.log('Sending data to your 87.5% accuracy trained model:', userData);
     
+    // Save a successful prediction to MongoDB and send the response
+    const saveAndRespond = async (mlResult) => {
+      if (!mlResult.success) {
+        return res.status(500).json({
+          success: false,
+          message: 'ML prediction failed',
+          error: mlResult.error
+        });
+      }
+      
+      // INITIALIZE assessmentResults if it doesn't exist
+      if (!user.assessmentResults) {
+        user.assessmentResults = {
+          cognitiveScore: 0,
+          skillsScore: 0,  
+          situationalScore: 0,
+          valuesScore: 0,
+          personalityScore: 0,
+          testScores: {},
+          personalityDetails: {},
+          careerCluster: {},
+          careerRecommendations: [],
+          model2Results: {},
+          model3Results: { predictedCareerRoles: [] },
+          testCompletionStatus: {
+            personalityTest: false,
+            cognitiveTest: false,
+            skillsTest: false,
+            situationalTest: false,
+            valuesTest: false
+          },
+          isAssessmentCompleted: false,
+          modelVersion: '1.0',
+          lastUpdated: new Date()
+        };
+      }
+      
+      // SAVE CAREER CLUSTER PREDICTION TO CORRECT MongoDB STRUCTURE
+      user.assessmentResults.model2Results = {
+        predictedCareerCluster: mlResult.prediction,
+        predictionConfidence: mlResult.confidence,
+        predictionMethod: mlResult.method,
+        predictionProbabilities: mlResult.all_probabilities,
+        lastPredictionDate: new Date()
+      };
+      
+      await user.save();
+      
+      console.log('Career cluster saved to MongoDB (CORRECT structure):', user.assessmentResults.model2Results);
+      
+      res.json({
+        success: true,
+        message: 'Career cluster prediction completed and saved',
+        data: {
+          userId: userId,
+          userProfile: {
+            name: user.name,
+            age: user.age,
+            interests: user.interests,
+            educationLevel: user.educationLevel
+          },
+          prediction: {
+            careerCluster: mlResult.prediction,
+            confidence: (mlResult.confidence * 100).toFixed(1) + '%',
+            method: mlResult.method,
+            timestamp: new Date().toISOString(),
+            savedToDatabase: true
+          },
+          inputData: userData,
+          modelDetails: {
+            allProbabilities: mlResult.all_probabilities,
+            trainingAccuracy: '87.5%',
+            algorithm: 'Random Forest (100 estimators)',
+            featuresUsed: Object.keys(userData)
+          }
+        }
+      });
+    };
+    
+    // Use the warm model server when available
+    const servedResult = await callModelServer('/model2', userData);
+    if (servedResult) {
+      console.log('Model 2 prediction served by model server:', servedResult);
+      return saveAndRespond(servedResult);
+    }
+    
     // Call your REAL Python ML model
     const pythonScriptPath = path.join(__dirname, '..', 'ml_models', 'model2', 'model2_cluster_predictor.py');
     
@@ -394,81 +481,7 @@ exports.predictCareerCluster = async (req, res) => {
         
         console.log('Your 87.5% accuracy ML model prediction:', mlResult);
         
-        if (!mlResult.success) {
-          return res.status(500).json({
-            success: false,
-            message: 'ML prediction failed',
-            error: mlResult.error
-          });
-        }
-        
-        // INITIALIZE assessmentResults if it doesn't exist
-        if (!user.assessmentResults) {
-          user.assessmentResults = {
-            cognitiveScore: 0,
-            skillsScore: 0,  
-            situationalScore: 0,
-            valuesScore: 0,
-            personalityScore: 0,
-            testScores: {},
-            personalityDetails: {},
-            careerCluster: {},
-            careerRecommendations: [],
-            model2Results: {},
-            model3Results: { predictedCareerRoles: [] },
-            testCompletionStatus: {
-              personalityTest: false,
-              cognitiveTest: false,
-              skillsTest: false,
-              situationalTest: false,
-              valuesTest: false
-            },
-            isAssessmentCompleted: false,
-            modelVersion: '1.0',
-            lastUpdated: new Date()
-          };
-        }
-        
-        // SAVE CAREER CLUSTER PREDICTION TO CORRECT MongoDB STRUCTURE
-        user.assessmentResults.model2Results = {
-          predictedCareerCluster: mlResult.prediction,
-          predictionConfidence: mlResult.confidence,
-          predictionMethod: mlResult.method,
-          predictionProbabilities: mlResult.all_probabilities,
-          lastPredictionDate: new Date()
-        };
-        
-        await user.save();
-        
-        console.log('Career cluster saved to MongoDB (CORRECT structure):', user.assessmentResults.model2Results);
-        
-        res.json({
-          success: true,
-          message: 'Career cluster prediction completed and saved',
-          data: {
-            userId: userId,
-            userProfile: {
-              name: user.name,
-              age: user.age,
-              interests: user.interests,
-              educationLevel: user.educationLevel
-            },
-            prediction: {
-              careerCluster: mlResult.prediction,
-              confidence: (mlResult.confidence * 100).toFixed(1) + '%',
-              method: mlResult.method,
-              timestamp: new Date().toISOString(),
-              savedToDatabase: true
-            },
-            inputData: userData,
-            modelDetails: {
-              allProbabilities: mlResult.all_probabilities,
-              trainingAccuracy: '87.5%',
-              algorithm: 'Random Forest (100 estimators)',
-              featuresUsed: Object.keys(userData)
-            }
-          }
-        });
+        await saveAndRespond(mlResult);
         
       } catch (parseError) {
         console.error('JSON parse error:', parseError);
@@ -495,6 +508,13 @@ exports.predictCareerCluster = async (req, res) => {
     
   } catch (error) {
     console.error('Model 2 Prediction Error:', error);
+    if (error instanceof ModelServerBusyError) {
+      return res.status(503).json({
+        success: false,
+        message: 'Model 2 is busy, please retry shortly',
+        retryable: true
+      });
+    }
     res.status(500).json({
       success: false,
       message: 'Model 2 prediction failed',
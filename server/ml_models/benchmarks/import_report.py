@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Import Time Report
+Imports each model module in a fresh interpreter under `python -X importtime`
+and reports the total import time and the packages that account for it
+
+Usage:
+    python import_report.py [--modules model1_scoring_engine ...] [--top 15] [--output report.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_MODELS_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+# Module -> directory it is imported from (the way Node spawns the scripts)
+MODULES = {
+    'model1_scoring_engine': os.path.join(ML_MODELS_DIR, 'model1'),
+    'model2_cluster_predictor': os.path.join(ML_MODELS_DIR, 'model2'),
+    'model3_career_role_predictor': os.path.join(ML_MODELS_DIR, 'model3'),
+    'pipeline': ML_MODELS_DIR,
+    'model_server': ML_MODELS_DIR
+}
+DEFAULT_TOP = 15
+
+
+def parse_importtime(stderr):
+    """Parse -X importtime output into [(module, self_us, cumulative_us)]"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        entries.append((module.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def import_report(module, top=DEFAULT_TOP):
+    """Import one module in a fresh interpreter and summarize where the time went"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=MODULES[module], capture_output=True, text=True
+    )
+    entries = parse_importtime(completed.stderr)
+
+    # Self times partition the total, so summing them per top-level package
+    # attributes every microsecond exactly once
+    packages = {}
+    for name, self_us, _ in entries:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    total_us = next((cumulative_us for name, _, cumulative_us in reversed(entries) if name == module), None)
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+    return {
+        'success': completed.returncode == 0,
+        'total_ms': round(total_us / 1000, 1) if total_us is not None else None,
+        'modules_imported': len(entries),
+        'packages_ms': {package: round(self_us / 1000, 1) for package, self_us in heaviest}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report per-package import time of the model modules")
+    parser.add_argument('--modules', nargs='+', choices=list(MODULES), default=list(MODULES))
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help="packages listed per module")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = {module: import_report(module, args.top) for module in args.modules}
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Model Benchmarks
+Measures cold start, warm latency, batch throughput and peak memory for
+Model 1 scoring, Model 2 prediction and Model 3 recommendation, using the
+bundled datasets as fixtures
+
+Each model runs in its own fresh Python process so cold start and peak RSS
+are not skewed by the others. Model 2 is measured without its prediction
+cache, since the fixtures repeat; the cached_* metrics repeat the same runs
+with the default cache. Results are written as JSON so runs from
+different commits can be compared with --compare.
+
+Usage:
+    python run_benchmarks.py [--models model1 model2] [--output results.json]
+    python run_benchmarks.py --compare baseline.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_MODELS_DIR = os.path.dirname(BENCHMARKS_DIR)
+DATASETS_DIR = os.path.join(ML_MODELS_DIR, 'datasets')
+
+MODELS = ('model1', 'model2', 'model3')
+DEFAULT_ITERATIONS = 200
+DEFAULT_BATCH_SIZE = 1000
+PERCENTILES = (50, 90, 99)
+
+# Metrics shown by --compare; lower is better for all but throughput
+COMPARED_METRICS = (
+    'cold_start_seconds', 'import_seconds', 'load_seconds',
+    'latency_ms_p50', 'latency_ms_p90', 'latency_ms_p99',
+    'batch_items_per_second', 'cached_latency_ms_p50', 'cached_batch_items_per_second', 'peak_rss_mb'
+)
+
+RESPONSE_FILES = ('Foundation_User_Responses.csv', 'Intermediate_User_Responses.csv', 'Advanced_User_Responses.csv')
+CLUSTER_FILE = 'DS2_Career_Cluster_Prediction.csv'
+ROLE_FILE = 'DS3_Career_Role_Recommendation.csv'
+MODEL2_FIELDS = ('age', 'gender', 'educationLevel', 'interests', 'personalityType')
+MODEL2_SCORES = ('personalityScore', 'cognitiveScore', 'skillsScore', 'situationalScore', 'valuesScore')
+ROLE_EDUCATIONS = (None, 'Graduation', 'Post-graduation', 'PhD')
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def read_csv_rows(file_name):
+    import csv
+    with open(os.path.join(DATASETS_DIR, file_name), newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def model1_fixtures():
+    """Assessment payloads from the *_User_Responses.csv exports"""
+    from model1_scoring_engine import iter_user_responses
+    return [
+        {'responses': responses, 'education_level': education_level, 'username': username}
+        for username, education_level, responses in iter_user_responses(
+            [os.path.join(DATASETS_DIR, file_name) for file_name in RESPONSE_FILES]
+        )
+    ]
+
+
+def model2_fixtures():
+    """Model 2 requests from the user profiles in the cluster training CSV"""
+    return [
+        {
+            **{field: row[field] for field in MODEL2_FIELDS},
+            **{field: float(row[field]) for field in MODEL2_SCORES},
+            'age': int(row['age'])
+        }
+        for row in read_csv_rows(CLUSTER_FILE)
+    ]
+
+
+def model3_fixtures():
+    """Model 3 requests for every catalogue cluster and a few education levels"""
+    clusters = sorted({row['CareerCluster'] for row in read_csv_rows(ROLE_FILE)})
+    return [
+        {'careerCluster': cluster, **({'user_education': education} if education else {})}
+        for cluster in clusters for education in ROLE_EDUCATIONS
+    ]
+
+
+def load_model(model):
+    """Import and load one model; returns (import_seconds, load_seconds, single, batch, fixtures)
+
+    single answers one request and batch a list of requests, the way the
+    Node server and the offline jobs call each model.
+    """
+    start = time.perf_counter()
+    if model == 'model1':
+        import model1_scoring_engine as engine
+    elif model == 'model2':
+        from model2_cluster_predictor import CareerPredictor
+    else:
+        from model3_career_role_predictor import CareerRolePredictor
+    imported = time.perf_counter()
+
+    if model == 'model1':
+        # The cohort tables (and the numpy import behind them) belong to
+        # loading, not to the first timed batch
+        for level in ('Foundation', 'Intermediate', 'Advanced'):
+            engine.get_question_bank(level)
+            engine.get_cohort_tables(level)
+        single, batch = engine.score_assessment, engine.score_cohort
+        fixtures = model1_fixtures()
+    elif model == 'model2':
+        predictor = CareerPredictor(model_path=os.path.join(ML_MODELS_DIR, 'model2'), cache_size=0)
+        single, batch = predictor.predict_career, predictor.predict_batch
+        fixtures = model2_fixtures()
+    else:
+        predictor = CareerRolePredictor()
+        single, batch = predictor.predict_from_input, predictor.predict_batch
+        fixtures = model3_fixtures()
+    loaded = time.perf_counter()
+
+    return imported - start, loaded - imported, single, batch, fixtures
+
+
+def time_requests(single, batch, fixtures, iterations, batch_size):
+    """Warm single-request latencies (sorted, ms) and the seconds one batch takes"""
+    latencies = []
+    for i in range(iterations):
+        request = fixtures[i % len(fixtures)]
+        start = time.perf_counter()
+        single(request)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    requests = [fixtures[i % len(fixtures)] for i in range(batch_size)]
+    start = time.perf_counter()
+    batch(requests)
+    return latencies, time.perf_counter() - start
+
+
+def timing_metrics(latencies, batch_size, batch_seconds, prefix=''):
+    return {
+        **{f'{prefix}latency_ms_p{pct}': round(percentile(latencies, pct), 4) for pct in PERCENTILES},
+        f'{prefix}latency_ms_mean': round(sum(latencies) / len(latencies), 4) if latencies else None,
+        f'{prefix}batch_seconds': round(batch_seconds, 4),
+        f'{prefix}batch_items_per_second': round(batch_size / batch_seconds, 1) if batch_seconds > 0 else None
+    }
+
+
+def run_worker(model, iterations, batch_size, result_path):
+    """Benchmark one model inside this (fresh) process and write the metrics as JSON"""
+    for model_dir in MODELS:
+        sys.path.insert(0, os.path.join(ML_MODELS_DIR, model_dir))
+
+    # Model chatter must not reach the parent; results go to result_path
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import_seconds, load_seconds, single, batch, fixtures = load_model(model)
+        ready_at = time.time()
+        latencies, batch_seconds = time_requests(single, batch, fixtures, iterations, batch_size)
+
+        cached = {}
+        if model == 'model2':
+            from model2_cluster_predictor import CareerPredictor
+            predictor = CareerPredictor(model_path=os.path.join(ML_MODELS_DIR, 'model2'))
+            cached_latencies, cached_batch_seconds = time_requests(
+                predictor.predict_career, predictor.predict_batch, fixtures, iterations, batch_size
+            )
+            cached = timing_metrics(cached_latencies, batch_size, cached_batch_seconds, prefix='cached_')
+
+    metrics = {
+        'ready_at': ready_at,
+        'import_seconds': round(import_seconds, 4),
+        'load_seconds': round(load_seconds, 4),
+        'fixtures': len(fixtures),
+        'iterations': iterations,
+        'batch_size': batch_size,
+        **timing_metrics(latencies, batch_size, batch_seconds),
+        **cached,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+    with open(result_path, 'w') as f:
+        json.dump(metrics, f)
+
+
+def benchmark_model(model, iterations, batch_size, verbose=False):
+    """Run one model's benchmark in a fresh interpreter and collect its metrics"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result_path = os.path.join(tmp_dir, f'{model}.json')
+        command = [
+            sys.executable, os.path.abspath(__file__), '--worker', model,
+            '--iterations', str(iterations), '--batch-size', str(batch_size),
+            '--result-file', result_path
+        ]
+
+        started_at = time.time()
+        completed = subprocess.run(command, stderr=None if verbose else subprocess.PIPE, text=True)
+
+        if completed.returncode != 0:
+            return {'error': (completed.stderr or '').strip()[-2000:] or f'exit code {completed.returncode}'}
+
+        with open(result_path) as f:
+            metrics = json.load(f)
+
+    # Interpreter start-up, imports and model loading, as a cold request sees it
+    metrics['cold_start_seconds'] = round(metrics.pop('ready_at') - started_at, 4)
+    return metrics
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=ML_MODELS_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(baseline, current):
+    """Print the change of every compared metric against a baseline run"""
+    print(f"{'model':8} {'metric':24} {'baseline':>12} {'current':>12} {'change':>8}")
+    for model, metrics in current['results'].items():
+        baseline_metrics = baseline.get('results', {}).get(model, {})
+        for metric in COMPARED_METRICS:
+            old, new = baseline_metrics.get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+            print(f"{model:8} {metric:24} {old:>12} {new:>12} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Model 1, 2 and 3 entry points")
+    parser.add_argument('--models', nargs='+', choices=MODELS, default=list(MODELS))
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help="warm single requests per model")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="requests in the batch throughput run")
+    parser.add_argument('--output', help="write the JSON results here instead of stdout")
+    parser.add_argument('--compare', help="baseline results JSON to compare this run against")
+    parser.add_argument('--verbose', action='store_true', help="show model log output on stderr")
+    parser.add_argument('--worker', choices=MODELS, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.iterations, args.batch_size, args.result_file)
+        return
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+            'batch_size': args.batch_size
+        },
+        'results': {}
+    }
+
+    for model in args.models:
+        print(f"[Benchmarks] Running {model}...", file=sys.stderr)
+        report['results'][model] = benchmark_model(model, args.iterations, args.batch_size, args.verbose)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        with contextlib.redirect_stdout(sys.stderr if not args.output else sys.stdout):
+            compare_results(baseline, report)
+
+
+if __name__ == "__main__":
+    main()
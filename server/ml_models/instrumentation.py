@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Model Instrumentation
+Opt-in stage timings, counters and histograms for the model scripts and the
+model server
+
+Disabled unless ML_MODEL_METRICS is set, in which case every finished request
+is written as one JSON line to the metrics channel, never to stdout:
+    ML_MODEL_METRICS=stderr            -> standard error
+    ML_MODEL_METRICS=/path/metrics.log -> appended to that file
+
+Entry points (CLI mains, server handlers) open a request; model code marks
+its stages, which are attributed to whatever request is current:
+
+    from instrumentation import metrics
+
+    with metrics.request('model2'):
+        with metrics.stage('encode'):
+            ...
+"""
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_ENV = 'ML_MODEL_METRICS'
+
+# Upper bounds (ms) of the latency histogram buckets; the last one catches the rest
+HISTOGRAM_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000, float('inf'))
+# Upper bounds of the buckets for counts such as batch sizes and queue depths
+HISTOGRAM_BUCKETS_COUNT = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, float('inf'))
+HISTOGRAM_BUCKETS = {'ms': HISTOGRAM_BUCKETS_MS, 'count': HISTOGRAM_BUCKETS_COUNT}
+
+
+class Histogram:
+    def __init__(self, unit='ms'):
+        self.unit = unit
+        self.bounds = HISTOGRAM_BUCKETS[unit]
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * len(self.bounds)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, upper in enumerate(self.bounds):
+            if value <= upper:
+                self.buckets[i] += 1
+                break
+
+    def to_dict(self):
+        return {
+            'unit': self.unit,
+            'count': self.count,
+            'sum': round(self.total, 4),
+            'min': self.min,
+            'max': self.max,
+            'buckets': {
+                ('+Inf' if upper == float('inf') else str(upper)): count
+                for upper, count in zip(self.bounds, self.buckets)
+            }
+        }
+
+
+class Metrics:
+    def __init__(self, channel=None):
+        self.channel = channel
+        self.enabled = bool(channel)
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        # Stage timings of the request running in this thread/context
+        self.current_stages = contextvars.ContextVar('current_stages', default=None)
+
+    def increment(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value, unit='ms'):
+        """Add a value to a histogram; unit 'ms' for latencies, 'count' for sizes"""
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(unit)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name):
+        """Time a one-off block (e.g. loading models at server start) into `name`_ms"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 4)
+            self.observe(f'{name}_ms', elapsed_ms)
+            self.emit({'event': 'timer', 'name': name, 'ms': elapsed_ms})
+
+    @contextmanager
+    def request(self, name):
+        """Time one request; its stages feed the `name`.`stage`_ms histograms"""
+        if not self.enabled:
+            yield
+            return
+
+        stages = {}
+        token = self.current_stages.set(stages)
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.current_stages.reset(token)
+            total_ms = round((time.perf_counter() - start) * 1000, 4)
+            self.increment(f'{name}.requests')
+            if failed:
+                self.increment(f'{name}.errors')
+            self.observe(f'{name}.total_ms', total_ms)
+            for stage, elapsed_ms in stages.items():
+                self.observe(f'{name}.{stage}_ms', elapsed_ms)
+            self.emit({'event': 'request', 'name': name, 'total_ms': total_ms, 'stages_ms': stages, 'failed': failed})
+
+    @contextmanager
+    def stage(self, stage):
+        """Add the time spent in a block to the current request's `stage`"""
+        stages = self.current_stages.get() if self.enabled else None
+        if stages is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            stages[stage] = round(stages.get(stage, 0) + elapsed_ms, 4)
+
+    @contextmanager
+    def collect_stages(self):
+        """Gather the stage timings of a block into the yielded dict (None when
+        disabled) without recording a request, e.g. in a pool worker whose
+        parent owns the request"""
+        if not self.enabled:
+            yield None
+            return
+        stages = {}
+        token = self.current_stages.set(stages)
+        try:
+            yield stages
+        finally:
+            self.current_stages.reset(token)
+
+    def add_stages(self, stages):
+        """Add stage timings gathered elsewhere (see collect_stages) to the current request"""
+        current = self.current_stages.get() if self.enabled else None
+        if current is None or not stages:
+            return
+        for stage, elapsed_ms in stages.items():
+            current[stage] = round(current.get(stage, 0) + elapsed_ms, 4)
+
+    def snapshot(self):
+        """All counters and histograms, JSON-ready"""
+        with self.lock:
+            return {
+                'enabled': self.enabled,
+                'counters': dict(self.counters),
+                'histograms': {name: histogram.to_dict() for name, histogram in self.histograms.items()}
+            }
+
+    def emit(self, record):
+        """Write one JSON line to the metrics channel"""
+        line = json.dumps({'timestamp': round(time.time(), 3), 'pid': os.getpid(), **record})
+        try:
+            if self.channel == 'stderr':
+                print(line, file=sys.stderr, flush=True)
+            else:
+                with self.lock, open(self.channel, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+        except OSError:
+            # Metrics must never break a request
+            pass
+
+
+def merge_snapshots(snapshots):
+    """Combine snapshot() results, e.g. of several worker processes, into one"""
+    merged = {'enabled': any(snapshot['enabled'] for snapshot in snapshots), 'counters': {}, 'histograms': {}}
+    for snapshot in snapshots:
+        for name, value in snapshot['counters'].items():
+            merged['counters'][name] = merged['counters'].get(name, 0) + value
+        for name, histogram in snapshot['histograms'].items():
+            total = merged['histograms'].get(name)
+            if total is None:
+                merged['histograms'][name] = {**histogram, 'buckets': dict(histogram['buckets'])}
+                continue
+            total['count'] += histogram['count']
+            total['sum'] = round(total['sum'] + histogram['sum'], 4)
+            # A histogram only exists once observed, so min/max are always set
+            total['min'] = min(total['min'], histogram['min'])
+            total['max'] = max(total['max'], histogram['max'])
+            for bucket, count in histogram['buckets'].items():
+                total['buckets'][bucket] = total['buckets'].get(bucket, 0) + count
+    return merged
+
+
+metrics = Metrics(os.environ.get(METRICS_ENV, '').strip() or None)
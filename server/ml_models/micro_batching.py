@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Micro-Batching
+Gathers concurrent single requests for a few milliseconds (or until a batch
+is full) and answers them with one call to a vectorized batch function
+
+Works from asyncio code (await batcher.submit(item)) and from threads such
+as the model server's request handlers (batcher.submit_threadsafe(item)),
+which hand their request to the batcher's own event loop thread.
+
+The batch function runs on an executor thread outside every caller's
+metrics request, so the stage timings of each batch are gathered there and
+added to the request of every item in it.
+"""
+
+import asyncio
+import contextvars
+import threading
+
+from instrumentation import metrics
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+
+
+class MicroBatcher:
+    def __init__(self, batch_fn, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS, name='batch'):
+        """batch_fn takes a list of items and returns one result per item, in order"""
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0) / 1000
+        self.name = name
+        self.loop = None
+        self.queue = None
+        self.worker = None
+        self.thread = None
+
+    async def submit(self, item, context=None):
+        """Queue one item and wait for its result
+
+        context is the caller's, whose metrics request gets the batch's
+        stage timings; it defaults to the current one.
+        """
+        if self.worker is None:
+            self.loop = asyncio.get_running_loop()
+            self.queue = asyncio.Queue()
+            self.worker = self.loop.create_task(self.run())
+
+        future = self.loop.create_future()
+        self.queue.put_nowait((item, future, context or contextvars.copy_context()))
+        return await future
+
+    def start(self):
+        """Run the batcher on a dedicated event loop thread for submit_threadsafe"""
+        if self.thread is not None:
+            return self
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name=f'{self.name}-batcher', daemon=True)
+        self.thread.start()
+        return self
+
+    def submit_threadsafe(self, item, timeout=None):
+        """Blocking submit from any thread; needs start()"""
+        if self.thread is None:
+            raise RuntimeError("MicroBatcher.start() must be called before submit_threadsafe()")
+        # The coroutine runs on the batcher's loop, so take this thread's context along
+        submission = self.submit(item, contextvars.copy_context())
+        return asyncio.run_coroutine_threadsafe(submission, self.loop).result(timeout)
+
+    def close(self):
+        if self.thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.thread = None
+
+    async def collect(self):
+        """Wait for the first item, then keep gathering until the batch is full or the window closes"""
+        batch = [await self.queue.get()]
+        deadline = self.loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def call_batch_fn(self, items):
+        """Run the batch function, returning its results and the stage timings it recorded"""
+        with metrics.collect_stages() as stages:
+            return self.batch_fn(items), stages
+
+    async def run(self):
+        while True:
+            batch = await self.collect()
+            items = [item for item, _, _ in batch]
+
+            metrics.increment(f'{self.name}.batches')
+            metrics.observe(f'{self.name}.batch_size', len(items), unit='count')
+
+            # Predict off the loop so the next batch keeps filling meanwhile
+            try:
+                results, stages = await self.loop.run_in_executor(None, self.call_batch_fn, items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"Batch function returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, context), result in zip(batch, results):
+                # A caller that timed out has already cancelled its future
+                if not future.done():
+                    context.run(metrics.add_stages, stages)
+                    future.set_result(result)
@@ -4,13 +4,250 @@ Model 1 Scoring Engine
 Processes user assessment responses and generates personality, cognitive, and skills scores
 """
 
+import argparse
+import csv
+import hashlib
 import json
+import os
+import pickle
 import sys
 import io
+from collections import namedtuple
+from functools import lru_cache
+from itertools import groupby
+from types import MappingProxyType
 
-# Fix encoding issues for Windows
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from instrumentation import metrics
+
+# Columns written by the bulk scorer in CSV mode
+CSV_RESULT_FIELDS = [
+    'username', 'education_level', 'personality_type', 'personality_score',
+    'personality_dominant_trait', 'cognitive_score', 'skills_score',
+    'situational_score', 'values_score', 'processed_responses',
+    'cognitive_correct', 'cognitive_total', 'skills_correct', 'skills_total',
+    'situational_correct', 'situational_total', 'values_correct', 'values_total',
+    'error'
+]
+
+EDUCATION_LEVELS = ('Foundation', 'Intermediate', 'Advanced')
+
+# Question metadata lives in datasets/<level>_Assessment_Questions.csv; the
+# compiled banks are cached under cache/ (bump the version if compiling changes)
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASETS_DIR = os.path.join(MODEL_DIR, '..', 'datasets')
+QUESTION_CACHE_DIR = os.path.join(MODEL_DIR, 'cache')
+QUESTION_CACHE_VERSION = 1
+
+# Map numeric answers to Likert responses
+LIKERT_ANSWER_MAPPING = {
+    '1': 'Strongly Disagree', '2': 'Disagree', '3': 'Neutral', 
+    '4': 'Agree', '5': 'Strongly Agree'
+}
+
+# Map Likert responses to numeric scores
+LIKERT_SCORES = {
+    'Strongly Disagree': 1, 'Disagree': 2, 'Neutral': 3, 
+    'Agree': 4, 'Strongly Agree': 5
+}
+
+# Trait score change for each Likert score under each scoring rule
+LIKERT_DELTAS = {
+    'likert_scale': {5: 2, 4: 1, 2: -1, 1: -2},
+    'likert_reverse': {1: 2, 2: 1, 4: -1, 5: -2}
+}
+
+# Personality type and description for each dominant trait
+PERSONALITY_TYPES = {
+    'Extraversion': 'Social Connector',
+    'Conscientiousness': 'Organized Achiever',
+    'Openness': 'Creative Explorer',
+    'Agreeableness': 'Collaborative Helper',
+    'Neuroticism': 'Thoughtful Analyzer'
+}
+
+PERSONALITY_DESCRIPTIONS = {
+    'Extraversion': 'Thrives in social interactions and enjoys meeting new people',
+    'Conscientiousness': 'Organized, disciplined, and achievement-oriented',
+    'Openness': 'Creative, curious, and open to new experiences',
+    'Agreeableness': 'Cooperative, empathetic, and team-oriented',
+    'Neuroticism': 'Thoughtful and analytical, may experience stress in high-pressure situations'
+}
+
+# A question ready for scoring: the trait delta for every Likert answer
+# (personality) or the set of answers that count as correct (all other types)
+CompiledQuestion = namedtuple('CompiledQuestion', ['type', 'trait', 'deltas', 'correct_answers'])
+
+def normalize_question_id(question_id: str) -> str:
+    """Normalize question ID by removing underscores"""
+    # Convert I_P001 -> IP001, I_S001 -> IS001, etc.
+    if '_' in question_id:
+        return question_id.replace('_', '')
+    return question_id
+
+def compile_question(question_info: dict) -> CompiledQuestion:
+    """Precompute the score contribution of every possible answer to a question"""
+    question_type = question_info['type']
+    deltas = {}
+    correct_answers = frozenset()
+    
+    if question_type == 'Personality':
+        rule = LIKERT_DELTAS.get(question_info['scoring'], {})
+        for answer in (*LIKERT_ANSWER_MAPPING, *LIKERT_SCORES):
+            base_score = LIKERT_SCORES.get(LIKERT_ANSWER_MAPPING.get(answer, answer), 3)
+            if rule.get(base_score):
+                deltas[answer] = rule[base_score]
+                
+    elif question_type in ('Cognitive', 'Skills'):
+        correct_answers = frozenset([question_info.get('correct_answer', '')])
+        
+    elif question_type in ('Situational', 'Values'):
+        # Consider scores >= 4 as "correct" for display purposes
+        score_map = question_info.get('scoring_map', {})
+        correct_answers = frozenset(answer for answer, score in score_map.items() if score >= 4)
+    
+    return CompiledQuestion(question_type, question_info.get('trait'), MappingProxyType(deltas), correct_answers)
+
+def resolve_education_level(education_level: str) -> str:
+    """Education level whose question bank is used, defaulting to Intermediate"""
+    return education_level if education_level in EDUCATION_LEVELS else 'Intermediate'
+
+def builtin_question_definitions(level: str) -> dict:
+    """Scoring rules hard-coded in this module for one level"""
+    if level == 'Foundation':
+        return Model1ScoringEngine._get_foundation_questions()
+    elif level == 'Intermediate':
+        return Model1ScoringEngine._get_intermediate_questions()
+    else:  # Advanced
+        return Model1ScoringEngine._get_advanced_questions()
+
+def parse_scoring_map(value: str) -> dict:
+    """Parse an optional Scoring_Map cell such as 'A:1;B:5;C:2;D:3;E:1'"""
+    scoring_map = {}
+    for item in (value or '').split(';'):
+        if ':' in item:
+            answer, score = item.split(':', 1)
+            scoring_map[answer.strip()] = int(score)
+    return scoring_map
+
+def read_question_csv(csv_path: str, builtin: dict) -> dict:
+    """Build scoring rules from an *_Assessment_Questions.csv file
+    
+    Test_Type, Trait_Measured, Correct_Answer and Weight come from the CSV.
+    The CSV cannot express reverse-keyed Likert items or partial credit on
+    situational/values options, so those come from optional Scoring and
+    Scoring_Map columns, then from the built-in rules for known questions.
+    New situational/values questions without a Scoring_Map give full credit
+    to Correct_Answer only.
+    """
+    questions = {}
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            question_id = row['Question_ID'].strip()
+            question_type = row['Test_Type'].strip()
+            correct_answer = (row.get('Correct_Answer') or '').strip()
+            known = builtin.get(question_id, {})
+            info = {'type': question_type}
+            
+            if question_type == 'Personality':
+                info['trait'] = (row.get('Trait_Measured') or '').strip() or known.get('trait')
+                info['scoring'] = (row.get('Scoring') or '').strip() or known.get('scoring', 'likert_scale')
+                
+            elif question_type in ('Cognitive', 'Skills'):
+                info['correct_answer'] = correct_answer
+                info['weight'] = int(float(row.get('Weight') or 1))
+                
+            elif question_type in ('Situational', 'Values'):
+                scoring_map = parse_scoring_map(row.get('Scoring_Map')) or dict(known.get('scoring_map', {}))
+                info['scoring_map'] = scoring_map or {correct_answer: 5}
+            
+            questions[question_id] = info
+    
+    return questions
+
+def load_question_bank_cache(cache_path: str, fingerprint: str):
+    """Return the cached (definitions, compiled) pair if it matches the CSV"""
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+    except Exception:
+        return None
+    
+    if cached.get('version') != QUESTION_CACHE_VERSION or cached.get('fingerprint') != fingerprint:
+        return None
+    return cached['definitions'], cached['compiled']
+
+def save_question_bank_cache(cache_path: str, fingerprint: str, definitions: dict, compiled: dict) -> None:
+    """Write the compiled bank next to older cache files for the same level"""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        payload = pickle.dumps({
+            'version': QUESTION_CACHE_VERSION,
+            'fingerprint': fingerprint,
+            'definitions': definitions,
+            'compiled': compiled
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: could not cache question bank: {e}", file=sys.stderr)
+
+@lru_cache(maxsize=None)
+def load_question_level(level: str):
+    """Load one level's scoring rules and compiled bank, once per process
+    
+    Rules come from the level's assessment CSV, falling back to the built-in
+    rules if it cannot be read. The compiled form is cached on disk keyed by
+    the CSV's SHA-256, so a warm start skips CSV parsing entirely.
+    """
+    csv_path = os.path.join(DATASETS_DIR, f'{level}_Assessment_Questions.csv')
+    
+    try:
+        with open(csv_path, 'rb') as f:
+            fingerprint = hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        fingerprint = None
+    
+    cache_path = os.path.join(QUESTION_CACHE_DIR, f'{level}_questions_{fingerprint}.pkl')
+    cached = load_question_bank_cache(cache_path, fingerprint) if fingerprint else None
+    
+    if cached:
+        definitions, compiled = cached
+    else:
+        builtin = builtin_question_definitions(level)
+        try:
+            definitions = read_question_csv(csv_path, builtin) if fingerprint else builtin
+        except Exception as e:
+            print(f"Warning: could not read {csv_path}, using built-in questions: {e}", file=sys.stderr)
+            definitions, fingerprint = builtin, None
+        
+        compiled = {}
+        for question_id, info in definitions.items():
+            question = compile_question(info)
+            compiled[normalize_question_id(question_id)] = (
+                question.type, question.trait, dict(question.deltas), sorted(question.correct_answers)
+            )
+        
+        if fingerprint:
+            save_question_bank_cache(cache_path, fingerprint, definitions, compiled)
+    
+    definitions = MappingProxyType({question_id: MappingProxyType(info) for question_id, info in definitions.items()})
+    bank = MappingProxyType({
+        question_id: CompiledQuestion(question_type, trait, MappingProxyType(deltas), frozenset(correct_answers))
+        for question_id, (question_type, trait, deltas, correct_answers) in compiled.items()
+    })
+    return definitions, bank
+
+def get_question_definitions(level: str):
+    """Read-only scoring rules for one level"""
+    return load_question_level(level)[0]
+
+def get_question_bank(level: str):
+    """Compiled question bank for one level keyed by normalized question ID"""
+    return load_question_level(level)[1]
 
 class Model1ScoringEngine:
     def __init__(self):
@@ -35,29 +272,14 @@ class Model1ScoringEngine:
 
     def normalize_question_id(self, question_id: str) -> str:
         """Normalize question ID by removing underscores"""
-        # Convert I_P001 -> IP001, I_S001 -> IS001, etc.
-        if '_' in question_id:
-            return question_id.replace('_', '')
-        return question_id
+        return normalize_question_id(question_id)
 
     def load_questions_database(self, education_level: str) -> dict:
-        """Load question database based on education level"""
-        level_mapping = {
-            'Foundation': 'Foundation',
-            'Intermediate': 'Intermediate', 
-            'Advanced': 'Advanced'
-        }
-        
-        prefix = level_mapping.get(education_level, 'Intermediate')
-        
-        if prefix == 'Foundation':
-            return self._get_foundation_questions()
-        elif prefix == 'Intermediate':
-            return self._get_intermediate_questions()
-        else:  # Advanced
-            return self._get_advanced_questions()
-
-    def _get_foundation_questions(self) -> dict:
+        """Load question database based on education level (shared, read-only)"""
+        return get_question_definitions(resolve_education_level(education_level))
+
+    @staticmethod
+    def _get_foundation_questions() -> dict:
         return {
             # Personality Questions (FP001-FP019) - Likert scale
             'FP001': {'type': 'Personality', 'trait': 'Extraversion', 'scoring': 'likert_scale'},
@@ -145,7 +367,8 @@ class Model1ScoringEngine:
             'FV011': {'type': 'Values', 'scoring_map': {'A': 5, 'B': 4, 'C': 3, 'D': 2, 'E': 1}},
         }
 
-    def _get_intermediate_questions(self) -> dict:
+    @staticmethod
+    def _get_intermediate_questions() -> dict:
         """Intermediate level questions database - NO UNDERSCORES (MATCHES CSV)"""
         return {
             # PERSONALITY QUESTIONS (IP001-IP019)
@@ -234,7 +457,8 @@ class Model1ScoringEngine:
             'IV011': {'type': 'Values', 'scoring_map': {'A': 3, 'B': 4, 'C': 4, 'D': 4, 'E': 5}},
         }
     
-    def _get_advanced_questions(self) -> dict:
+    @staticmethod
+    def _get_advanced_questions() -> dict:
         """Advanced level questions database - NO UNDERSCORES"""
         return {
             # PERSONALITY (AP001-AP019)
@@ -323,97 +547,6 @@ class Model1ScoringEngine:
             'AV011': {'type': 'Values', 'scoring_map': {'A': 2, 'B': 5, 'C': 3, 'D': 4, 'E': 3}},
         }
 
-    def calculate_personality_score(self, question_id: str, answer: str, question_info: dict) -> None:
-        """Calculate personality score for Likert scale questions"""
-        trait = question_info['trait']
-        scoring_type = question_info['scoring']
-        
-        # Map numeric answers to Likert responses
-        answer_mapping = {
-            '1': 'Strongly Disagree', '2': 'Disagree', '3': 'Neutral', 
-            '4': 'Agree', '5': 'Strongly Agree'
-        }
-        
-        likert_answer = answer_mapping.get(answer, answer)
-        
-        # Map Likert responses to numeric scores
-        likert_scores = {
-            'Strongly Disagree': 1, 'Disagree': 2, 'Neutral': 3, 
-            'Agree': 4, 'Strongly Agree': 5
-        }
-        
-        base_score = likert_scores.get(likert_answer, 3)
-        
-        # Apply scoring rule
-        if scoring_type == 'likert_scale':
-            if base_score == 5:  # Strongly Agree
-                self.personality_scores[trait] += 2
-            elif base_score == 4:  # Agree
-                self.personality_scores[trait] += 1
-            elif base_score == 2:  # Disagree
-                self.personality_scores[trait] -= 1
-            elif base_score == 1:  # Strongly Disagree
-                self.personality_scores[trait] -= 2
-            
-        elif scoring_type == 'likert_reverse':
-            if base_score == 1:  # Strongly Disagree (good for reverse)
-                self.personality_scores[trait] += 2
-            elif base_score == 2:  # Disagree
-                self.personality_scores[trait] += 1
-            elif base_score == 4:  # Agree (bad for reverse)
-                self.personality_scores[trait] -= 1
-            elif base_score == 5:  # Strongly Agree (worst for reverse)
-                self.personality_scores[trait] -= 2
-        
-        self.detailed_scores['personality']['responses'] += 1
-        self.detailed_scores['personality']['total_possible'] += 2
-
-    def calculate_cognitive_skills_score(self, question_id: str, answer: str, question_info: dict) -> None:
-        """Calculate cognitive and skills scores for multiple choice questions"""
-        question_type = question_info['type']
-        correct_answer = question_info.get('correct_answer', '')
-        weight = question_info.get('weight', 1)
-        
-        is_correct = answer == correct_answer
-        
-        if question_type == 'Cognitive':
-            # DON'T INCREMENT TOTAL HERE - handled in process_responses
-            if is_correct:
-                self.cognitive_score += weight
-                self.detailed_scores['cognitive']['correct'] += 1
-                
-        elif question_type == 'Skills':
-            # DON'T INCREMENT TOTAL HERE - handled in process_responses
-            if is_correct:
-                self.skills_score += weight
-                self.detailed_scores['skills']['correct'] += 1
-
-
-
-    def calculate_situational_values_score(self, question_id, answer, question_info):
-        """Calculate scores for situational and values questions"""
-        question_type = question_info['type']
-        
-        if question_type == 'Situational':
-            # DON'T INCREMENT TOTAL HERE - handled in process_responses
-            if 'scoring_map' in question_info:
-                score_map = question_info['scoring_map']
-                if answer in score_map:
-                    # Consider scores >= 4 as "correct" for display purposes
-                    if score_map[answer] >= 4:
-                        self.detailed_scores['situational']['correct'] += 1 
-                        
-        elif question_type == 'Values':
-            # DON'T INCREMENT TOTAL HERE - handled in process_responses
-            if 'scoring_map' in question_info:
-                score_map = question_info['scoring_map']
-                if answer in score_map:
-                    # Consider scores >= 4 as "correct" for display purposes
-                    if score_map[answer] >= 4:
-                        self.detailed_scores['values']['correct'] += 1
-
-
-
     def determine_personality_type(self) -> tuple:
         """Determine dominant personality type and traits"""
         # Find dominant trait
@@ -421,15 +554,7 @@ class Model1ScoringEngine:
         dominant_score = self.personality_scores.get(dominant_trait, 0)
         
         # Generate personality type based on scores
-        personality_types = {
-            'Extraversion': 'Social Connector',
-            'Conscientiousness': 'Organized Achiever', 
-            'Openness': 'Creative Explorer',
-            'Agreeableness': 'Collaborative Helper',
-            'Neuroticism': 'Thoughtful Analyzer'
-        }
-        
-        personality_type = personality_types.get(dominant_trait, 'Balanced Individual')
+        personality_type = PERSONALITY_TYPES.get(dominant_trait, 'Balanced Individual')
         
         # Calculate overall personality score (0-100)
         total_possible = len(self.personality_scores) * 4 if self.detailed_scores['personality']['responses'] > 0 else 1
@@ -437,23 +562,17 @@ class Model1ScoringEngine:
         personality_score = min(100, (current_total / total_possible) * 100) if current_total > 0 else 50
         
         # Generate description
-        descriptions = {
-            'Extraversion': 'Thrives in social interactions and enjoys meeting new people',
-            'Conscientiousness': 'Organized, disciplined, and achievement-oriented',
-            'Openness': 'Creative, curious, and open to new experiences', 
-            'Agreeableness': 'Cooperative, empathetic, and team-oriented',
-            'Neuroticism': 'Thoughtful and analytical, may experience stress in high-pressure situations'
-        }
-        
-        description = descriptions.get(dominant_trait, 'Shows balanced traits across multiple dimensions')
+        description = PERSONALITY_DESCRIPTIONS.get(dominant_trait, 'Shows balanced traits across multiple dimensions')
         
         return personality_type, personality_score, dominant_trait, description
 
     def process_responses(self, responses: list, education_level: str, username: str) -> dict:
         """Main processing function for user responses"""
         try:
-            # Load question database
-            questions_db = self.load_questions_database(education_level)
+            # Compiled question bank, shared by every engine in this process
+            with metrics.stage('load'):
+                question_bank = get_question_bank(resolve_education_level(education_level))
+            personality_details = self.detailed_scores['personality']
             processed_count = 0
             
             # Initialize counters for ACTUAL user attempts
@@ -461,90 +580,76 @@ class Model1ScoringEngine:
             user_correct = {'Cognitive': 0, 'Skills': 0, 'Situational': 0, 'Values': 0}
             
             # Process each response and count ONLY what user actually attempted
-            for response in responses:
-                question_id = response.get('Question_ID', '').strip()
-                answer = str(response.get('Answer', '')).strip()
-                
-                if not question_id or not answer:
-                    continue
-                
-                # Normalize question ID
-                normalized_id = self.normalize_question_id(question_id)
-                question_info = questions_db.get(normalized_id) or questions_db.get(question_id)
-                
-                if not question_info:
-                    continue
-                
-                processed_count += 1
-                question_type = question_info['type']
-                
-                # Count this as an attempt
-                if question_type in user_attempts:
-                    user_attempts[question_type] += 1
-                
-                # Score the question and count if correct
-                if question_type == 'Personality':
-                    self.calculate_personality_score(question_id, answer, question_info)
+            with metrics.stage('score'):
+                for response in responses:
+                    question_id = response.get('Question_ID', '').strip()
+                    answer = str(response.get('Answer', '')).strip()
                     
-                elif question_type == 'Cognitive':
-                    correct_answer = question_info.get('correct_answer', '')
-                    if answer == correct_answer:
-                        user_correct['Cognitive'] += 1
-                        
-                elif question_type == 'Skills':
-                    correct_answer = question_info.get('correct_answer', '')
-                    if answer == correct_answer:
-                        user_correct['Skills'] += 1
+                    if not question_id or not answer:
+                        continue
+                    
+                    # Normalize question ID
+                    question = question_bank.get(normalize_question_id(question_id))
+                    
+                    if question is None:
+                        continue
+                    
+                    processed_count += 1
+                    question_type = question.type
+                    
+                    # Score the question and count if correct
+                    if question_type == 'Personality':
+                        self.personality_scores[question.trait] += question.deltas.get(answer, 0)
+                        personality_details['responses'] += 1
+                        personality_details['total_possible'] += 2
                         
-                elif question_type == 'Situational':
-                    if 'scoring_map' in question_info:
-                        score_map = question_info['scoring_map']
-                        if answer in score_map and score_map[answer] >= 4:
-                            user_correct['Situational'] += 1
-                            
-                elif question_type == 'Values':
-                    if 'scoring_map' in question_info:
-                        score_map = question_info['scoring_map']
-                        if answer in score_map and score_map[answer] >= 4:
-                            user_correct['Values'] += 1
-            
-            # SET RESULTS TO EXACTLY WHAT USER ATTEMPTED
-            self.detailed_scores['cognitive']['correct'] = user_correct['Cognitive']
-            self.detailed_scores['cognitive']['total'] = user_attempts['Cognitive']
-            self.detailed_scores['skills']['correct'] = user_correct['Skills'] 
-            self.detailed_scores['skills']['total'] = user_attempts['Skills']
-            self.detailed_scores['situational']['correct'] = user_correct['Situational']
-            self.detailed_scores['situational']['total'] = user_attempts['Situational']
-            self.detailed_scores['values']['correct'] = user_correct['Values']
-            self.detailed_scores['values']['total'] = user_attempts['Values']
-            
-            # Calculate percentages
-            self._calculate_final_percentages()
-            
-            # Determine personality type
-            personality_type, personality_score, dominant_trait, description = self.determine_personality_type()
-            
-            # Return results
-            results = {
-                'username': username,
-                'education_level': education_level,
-                'personality_type': personality_type,
-                'personality_score': personality_score,
-                'personality_dominant_trait': dominant_trait,
-                'personality_description': description,
-                'cognitive_score': self.detailed_scores['cognitive']['percentage'] / 100 if self.detailed_scores['cognitive']['total'] > 0 else 0,
-                'skills_score': self.detailed_scores['skills']['percentage'] / 100 if self.detailed_scores['skills']['total'] > 0 else 0,
-                'situational_score': self.detailed_scores['situational']['percentage'] / 100 if self.detailed_scores['situational']['total'] > 0 else 0,
-                'values_score': self.detailed_scores['values']['percentage'] / 100 if self.detailed_scores['values']['total'] > 0 else 0,
-                'detailed_scores': self.detailed_scores,
-                'processed_responses': processed_count
-            }
-            
-            return results
+                    elif question_type in user_attempts:
+                        # Count this as an attempt
+                        user_attempts[question_type] += 1
+                        if answer in question.correct_answers:
+                            user_correct[question_type] += 1
+                
+                return self.finalize_results(username, education_level, user_attempts, user_correct, processed_count)
             
         except Exception as e:
             raise e
 
+    def finalize_results(self, username: str, education_level: str, user_attempts: dict, user_correct: dict, processed_count: int) -> dict:
+        """Turn the accumulated counts into the result returned to Node.js"""
+        # SET RESULTS TO EXACTLY WHAT USER ATTEMPTED
+        self.detailed_scores['cognitive']['correct'] = user_correct['Cognitive']
+        self.detailed_scores['cognitive']['total'] = user_attempts['Cognitive']
+        self.detailed_scores['skills']['correct'] = user_correct['Skills'] 
+        self.detailed_scores['skills']['total'] = user_attempts['Skills']
+        self.detailed_scores['situational']['correct'] = user_correct['Situational']
+        self.detailed_scores['situational']['total'] = user_attempts['Situational']
+        self.detailed_scores['values']['correct'] = user_correct['Values']
+        self.detailed_scores['values']['total'] = user_attempts['Values']
+        
+        # Calculate percentages
+        self._calculate_final_percentages()
+        
+        # Determine personality type
+        personality_type, personality_score, dominant_trait, description = self.determine_personality_type()
+        
+        # Return results
+        results = {
+            'username': username,
+            'education_level': education_level,
+            'personality_type': personality_type,
+            'personality_score': personality_score,
+            'personality_dominant_trait': dominant_trait,
+            'personality_description': description,
+            'cognitive_score': self.detailed_scores['cognitive']['percentage'] / 100 if self.detailed_scores['cognitive']['total'] > 0 else 0,
+            'skills_score': self.detailed_scores['skills']['percentage'] / 100 if self.detailed_scores['skills']['total'] > 0 else 0,
+            'situational_score': self.detailed_scores['situational']['percentage'] / 100 if self.detailed_scores['situational']['total'] > 0 else 0,
+            'values_score': self.detailed_scores['values']['percentage'] / 100 if self.detailed_scores['values']['total'] > 0 else 0,
+            'detailed_scores': self.detailed_scores,
+            'processed_responses': processed_count
+        }
+        
+        return results
+
 
 
 
@@ -572,7 +677,7 @@ class Model1ScoringEngine:
         if self.detailed_scores['values']['total'] > 0:
             percentage = (self.detailed_scores['values']['correct'] / self.detailed_scores['values']['total']) * 100
             self.detailed_scores['values']['percentage'] = round(percentage, 1)
-            print(f"🔍 Values calc: {self.detailed_scores['values']['correct']}/{self.detailed_scores['values']['total']} = {percentage}%")
+            print(f"🔍 Values calc: {self.detailed_scores['values']['correct']}/{self.detailed_scores['values']['total']} = {percentage}%", file=sys.stderr)
 
 
 
@@ -603,32 +708,369 @@ class Model1ScoringEngine:
                 (self.detailed_scores['values']['correct'] / self.detailed_scores['values']['total']) * 100, 1
             )
 
-def main():
-    """Main entry point for the scoring engine"""
-    try:
-        # Read input from Node.js
-        input_data = sys.stdin.read().strip()
-        
-        if not input_data:
-            raise ValueError("No input data received")
+# Counters accumulated by the vectorized cohort scorer, in weight-table column
+# order: trait deltas, personality responses, attempts and correct answers per
+# test type, then the processed response count
+TRAITS = ('Extraversion', 'Conscientiousness', 'Openness', 'Agreeableness', 'Neuroticism')
+SCORED_TYPES = ('Cognitive', 'Skills', 'Situational', 'Values')
+PERSONALITY_COLUMN = len(TRAITS)
+ATTEMPT_COLUMNS = PERSONALITY_COLUMN + 1
+CORRECT_COLUMNS = ATTEMPT_COLUMNS + len(SCORED_TYPES)
+PROCESSED_COLUMN = CORRECT_COLUMNS + len(SCORED_TYPES)
+COHORT_CHUNK_SIZE = 1024
+
+CohortTables = namedtuple('CohortTables', ['question_index', 'answer_codes', 'weights'])
+
+@lru_cache(maxsize=None)
+def get_cohort_tables(level: str) -> CohortTables:
+    """Precomputed key and weight tables for vectorized scoring of one level
+    
+    Row q * n_codes + a of weights holds what answering question q with
+    answer code a adds to every counter. Code 0 means unanswered, code 1 any
+    answer that carries no delta or credit, and codes from 2 up the answers
+    that do.
+    """
+    import numpy as np
+    
+    bank = get_question_bank(level)
+    question_index = {question_id: q for q, question_id in enumerate(bank)}
+    answers = sorted({answer for question in bank.values() for answer in (*question.deltas, *question.correct_answers)})
+    answer_codes = {answer: code for code, answer in enumerate(answers, start=2)}
+    
+    weights = np.zeros((len(bank), len(answers) + 2, PROCESSED_COLUMN + 1))
+    for question_id, question in bank.items():
+        q = question_index[question_id]
+        answered = weights[q, 1:]
+        answered[:, PROCESSED_COLUMN] = 1
         
-        # Parse JSON input
-        data = json.loads(input_data)
+        if question.type == 'Personality':
+            answered[:, PERSONALITY_COLUMN] = 1
+            trait_column = TRAITS.index(question.trait)
+            for answer, delta in question.deltas.items():
+                weights[q, answer_codes[answer], trait_column] = delta
+                
+        elif question.type in SCORED_TYPES:
+            type_column = SCORED_TYPES.index(question.type)
+            answered[:, ATTEMPT_COLUMNS + type_column] = 1
+            for answer in question.correct_answers:
+                weights[q, answer_codes[answer], CORRECT_COLUMNS + type_column] = 1
+    
+    weights = weights.reshape(-1, PROCESSED_COLUMN + 1)
+    weights.setflags(write=False)
+    return CohortTables(MappingProxyType(question_index), MappingProxyType(answer_codes), weights)
+
+def read_user_responses(response_lists: list):
+    """Read every user's responses one by one, as process_responses reads them
+    
+    Returns each user's response count, the flat stripped question ID and
+    answer columns, and {user position: error} for users whose responses
+    could not be read.
+    """
+    lengths, question_ids, answers = [], [], []
+    errors = {}
+    
+    for u, responses in enumerate(response_lists):
+        try:
+            user_question_ids = [response.get('Question_ID', '').strip() for response in responses]
+            user_answers = [str(response.get('Answer', '')).strip() for response in responses]
+        except Exception as e:
+            errors[u] = str(e)
+            user_question_ids = user_answers = []
         
-        # Extract parameters
-        responses = data.get('responses', [])
-        education_level = data.get('education_level', 'Intermediate')
-        username = data.get('username', 'Unknown User')
+        lengths.append(len(user_question_ids))
+        question_ids.extend(user_question_ids)
+        answers.extend(user_answers)
+    
+    return lengths, question_ids, answers, errors
+
+class CohortLookup(dict):
+    """Raw value -> array index, computed on first sight of each distinct value"""
+    
+    def __init__(self, index_of):
+        super().__init__()
+        self.index_of = index_of
+    
+    def __missing__(self, value):
+        index = self[value] = self.index_of(value)
+        return index
+
+def cohort_lookups(tables: CohortTables):
+    """Lookups from raw question IDs to bank rows and raw answers to answer codes
+    
+    Each distinct value is stripped once, on first lookup. Unknown or blank
+    question IDs map to -1 and blank answers to code 0. Raises TypeError for
+    anything but strings, which process_responses would convert or reject.
+    """
+    def question_row(question_id):
+        question_id = str.strip(question_id)
+        return tables.question_index.get(normalize_question_id(question_id), -1) if question_id else -1
+    
+    def answer_code(answer):
+        answer = str.strip(answer)
+        return tables.answer_codes.get(answer, 1) if answer else 0
+    
+    return CohortLookup(question_row), CohortLookup(answer_code)
+
+def encode_cohort(response_lists: list, tables: CohortTables):
+    """Encode responses as the weight-table row of every scored response
+    
+    The chunk is flattened into one column of bank rows and one of answer
+    codes, in one pass over the responses each. Only a chunk holding
+    malformed responses or non-string values is read user by user, so errors
+    land on the right users. Returns the rows grouped by user, the offsets
+    where each user's rows start (user u owns cells[offsets[u]:offsets[u + 1]])
+    and {user position: error} for users whose responses could not be read.
+    """
+    import numpy as np
+    
+    question_lookup, code_lookup = cohort_lookups(tables)
+    try:
+        questions = [question_lookup[response.get('Question_ID', '')] for responses in response_lists for response in responses]
+        codes = [code_lookup[response.get('Answer', '')] for responses in response_lists for response in responses]
+        lengths = [len(responses) for responses in response_lists]
+        errors = {}
+    except (AttributeError, TypeError):
+        lengths, question_ids, answers, errors = read_user_responses(response_lists)
+        questions = [question_lookup[question_id] for question_id in question_ids]
+        codes = [code_lookup[answer] for answer in answers]
+    
+    questions = np.fromiter(questions, dtype=np.intp, count=len(questions))
+    codes = np.fromiter(codes, dtype=np.intp, count=len(codes))
+    users = np.repeat(np.arange(len(response_lists), dtype=np.intp), lengths)
+    
+    n_codes = tables.weights.shape[0] // len(tables.question_index)
+    known = questions >= 0
+    cells = questions[known] * n_codes + codes[known]
+    offsets = np.searchsorted(users[known], np.arange(len(response_lists) + 1))
+    
+    return cells, offsets, errors
+
+def cohort_totals(cells, offsets, weights):
+    """Sum each user's weight-table rows into their counters
+    
+    Repeated answers add their row again, so they are counted exactly as
+    process_responses counts them. The weights are small integers, so the
+    running sums are exact.
+    """
+    import numpy as np
+    
+    cumulative = np.zeros((len(cells) + 1, weights.shape[1]))
+    np.cumsum(weights[cells], axis=0, out=cumulative[1:])
+    return np.rint(cumulative[offsets[1:]] - cumulative[offsets[:-1]]).astype(np.int64)
+
+def cohort_results(users: list, totals) -> list:
+    """Build each user's result from their row of cohort counters
+    
+    Computes exactly what finalize_results and determine_personality_type
+    compute from the same counts, without an engine per user. argmax picks
+    the first of tied traits, as max() over personality_scores does.
+    """
+    import numpy as np
+    
+    trait_scores = totals[:, :PERSONALITY_COLUMN]
+    dominant_traits = [TRAITS[t] for t in trait_scores.argmax(axis=1).tolist()]
+    trait_totals = np.abs(trait_scores).sum(axis=1).tolist()
+    
+    results = []
+    for user, row, dominant_trait, current_total in zip(users, totals.tolist(), dominant_traits, trait_totals):
+        responses = row[PERSONALITY_COLUMN]
+        total_possible = len(TRAITS) * 4 if responses > 0 else 1
         
-        if not responses:
-            raise ValueError("No responses provided")
+        cognitive_total, skills_total, situational_total, values_total = row[ATTEMPT_COLUMNS:CORRECT_COLUMNS]
+        cognitive_correct, skills_correct, situational_correct, values_correct = row[CORRECT_COLUMNS:PROCESSED_COLUMN]
+        cognitive = round((cognitive_correct / cognitive_total) * 100, 1) if cognitive_total > 0 else 0
+        skills = round((skills_correct / skills_total) * 100, 1) if skills_total > 0 else 0
+        situational = round((situational_correct / situational_total) * 100, 1) if situational_total > 0 else 0
+        values = round((values_correct / values_total) * 100, 1) if values_total > 0 else 0
         
-        # Initialize and run scoring engine
-        engine = Model1ScoringEngine()
-        results = engine.process_responses(responses, education_level, username)
+        results.append({
+            'username': user.get('username', 'Unknown User'),
+            'education_level': user.get('education_level', 'Intermediate'),
+            'personality_type': PERSONALITY_TYPES[dominant_trait],
+            'personality_score': min(100, (current_total / total_possible) * 100) if current_total > 0 else 50,
+            'personality_dominant_trait': dominant_trait,
+            'personality_description': PERSONALITY_DESCRIPTIONS[dominant_trait],
+            'cognitive_score': cognitive / 100 if cognitive_total > 0 else 0,
+            'skills_score': skills / 100 if skills_total > 0 else 0,
+            'situational_score': situational / 100 if situational_total > 0 else 0,
+            'values_score': values / 100 if values_total > 0 else 0,
+            'detailed_scores': {
+                'personality': {'responses': responses, 'total_possible': 2 * responses},
+                'cognitive': {'correct': cognitive_correct, 'total': cognitive_total, 'percentage': cognitive},
+                'skills': {'correct': skills_correct, 'total': skills_total, 'percentage': skills},
+                'situational': {'correct': situational_correct, 'total': situational_total, 'percentage': situational},
+                'values': {'correct': values_correct, 'total': values_total, 'percentage': values}
+            },
+            'processed_responses': row[PROCESSED_COLUMN]
+        })
+    
+    return results
+
+def score_cohort(users: list) -> list:
+    """Score many users at once with array operations
+    
+    users are dicts with responses, education_level and username, as taken
+    by score_assessment. Every counter is a sum of rows of the level's
+    weight table, one row per scored response; results match
+    process_responses exactly and are returned in input order.
+    """
+    users = list(users)
+    results = [None] * len(users)
+    
+    by_level = {}
+    for position, user in enumerate(users):
+        level = resolve_education_level(user.get('education_level', 'Intermediate'))
+        by_level.setdefault(level, []).append(position)
+    
+    for level, positions in by_level.items():
+        with metrics.stage('load'):
+            tables = get_cohort_tables(level)
         
-        # Output ONLY JSON results (no print statements)
-        print(json.dumps(results, indent=2, ensure_ascii=False))
+        for start in range(0, len(positions), COHORT_CHUNK_SIZE):
+            chunk = positions[start:start + COHORT_CHUNK_SIZE]
+            with metrics.stage('encode'):
+                cells, offsets, errors = encode_cohort([users[p].get('responses', []) for p in chunk], tables)
+            
+            with metrics.stage('score'):
+                chunk_users = [users[p] for p in chunk]
+                chunk_results = cohort_results(chunk_users, cohort_totals(cells, offsets, tables.weights))
+                
+                for u, error in errors.items():
+                    chunk_results[u] = {
+                        'username': chunk_users[u].get('username', 'Unknown User'),
+                        'education_level': chunk_users[u].get('education_level', 'Intermediate'),
+                        'error': error
+                    }
+                for position, result in zip(chunk, chunk_results):
+                    results[position] = result
+    
+    return results
+
+def score_assessment(data: dict) -> dict:
+    """Score one assessment request (responses, education_level, username)"""
+    # Extract parameters
+    responses = data.get('responses', [])
+    education_level = data.get('education_level', 'Intermediate')
+    username = data.get('username', 'Unknown User')
+    
+    if not responses:
+        raise ValueError("No responses provided")
+    
+    # Initialize and run scoring engine
+    engine = Model1ScoringEngine()
+    return engine.process_responses(responses, education_level, username)
+
+def iter_user_responses(csv_paths):
+    """Stream (username, education_level, responses) from long-format response CSVs
+    
+    Expects the username, education_level, Question_ID, Answer columns of the
+    *_User_Responses.csv files. Rows for one user must be contiguous, as they
+    are in those exports, so only one user is held in memory at a time.
+    """
+    for csv_path in csv_paths:
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            for username, rows in groupby(csv.DictReader(f), key=lambda row: row['username']):
+                rows = list(rows)
+                education_level = rows[0].get('education_level') or 'Intermediate'
+                responses = [{'Question_ID': row['Question_ID'], 'Answer': row['Answer']} for row in rows]
+                yield username, education_level, responses
+
+def flatten_result(result):
+    """Flatten a scoring result into one CSV row"""
+    row = dict(result)
+    for section, scores in result.get('detailed_scores', {}).items():
+        if section != 'personality':
+            row[f'{section}_correct'] = scores['correct']
+            row[f'{section}_total'] = scores['total']
+    return row
+
+def score_response_files(csv_paths, output, output_format='jsonl'):
+    """Score every user in the response CSVs in one process
+    
+    Writes one result per user to output as JSON lines or CSV and returns the
+    number of users scored. A user that fails to score gets an error record.
+    Users are scored in chunks with the vectorized cohort scorer.
+    """
+    csv_writer = None
+    if output_format == 'csv':
+        csv_writer = csv.DictWriter(output, fieldnames=CSV_RESULT_FIELDS, extrasaction='ignore')
+        csv_writer.writeheader()
+    
+    def write_results(users):
+        for result in score_cohort(users):
+            if csv_writer:
+                csv_writer.writerow(flatten_result(result))
+            else:
+                output.write(json.dumps(result, ensure_ascii=False) + '\n')
+        return len(users)
+    
+    # Score users in cohort-sized chunks as they stream in
+    scored = 0
+    users = []
+    for username, education_level, responses in iter_user_responses(csv_paths):
+        users.append({'username': username, 'education_level': education_level, 'responses': responses})
+        if len(users) == COHORT_CHUNK_SIZE:
+            scored += write_results(users)
+            users = []
+    
+    if users:
+        scored += write_results(users)
+    
+    return scored
+
+def score_files_main(argv):
+    """Command line entry point for bulk scoring of response CSVs"""
+    parser = argparse.ArgumentParser(
+        prog='model1_scoring_engine.py score-file',
+        description="Score every user in long-format assessment response CSVs"
+    )
+    parser.add_argument('csv_paths', nargs='+', help="response CSVs (username, education_level, Question_ID, Answer)")
+    parser.add_argument('--format', dest='output_format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('--output', help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+    
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as output:
+            scored = score_response_files(args.csv_paths, output, args.output_format)
+    else:
+        scored = score_response_files(args.csv_paths, sys.stdout, args.output_format)
+    
+    print(f"Scored {scored} users", file=sys.stderr)
+
+def main():
+    """Main entry point for the scoring engine"""
+    # Fix encoding issues for Windows; only for the CLI, never for importers
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'score-file':
+        score_files_main(sys.argv[2:])
+        return
+    
+    try:
+        with metrics.request('model1'):
+            # Read input from Node.js
+            input_data = sys.stdin.read().strip()
+            
+            if not input_data:
+                raise ValueError("No input data received")
+            
+            # Parse JSON input
+            with metrics.stage('parse'):
+                data = json.loads(input_data)
+            
+            # Prefer the warm model server when one is configured
+            from model_client import call_model_server
+            
+            with metrics.stage('forward'):
+                results = call_model_server('/model1', data)
+            if results is None:
+                results = score_assessment(data)
+            
+            # Output ONLY JSON results (no print statements)
+            with metrics.stage('serialize'):
+                output = json.dumps(results, indent=2, ensure_ascii=False)
+        print(output)
         
     except Exception as e:
         error_result = {
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Compact Forest
+Array-backed copy of the Model 2 random forest that loads without joblib or
+scikit-learn and predicts with NumPy only
+
+The trees are flattened into one set of node arrays (feature, threshold,
+children, leaf class probabilities) stored as .npy files next to a JSON
+manifest. Arrays are opened memory-mapped, so every worker process on the
+machine shares the same pages of the model.
+"""
+
+import json
+import os
+
+import numpy as np
+
+FOREST_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+ARRAY_NAMES = ('feature', 'threshold', 'children_left', 'children_right', 'value', 'roots')
+
+
+def save_array(output_dir, name, array):
+    """Write one .npy file without readers ever seeing a partial file"""
+    path = os.path.join(output_dir, f'{name}.npy')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def export_forest(model, feature_names, label_classes, model_sha256, output_dir):
+    """Flatten a fitted RandomForestClassifier into output_dir
+
+    label_classes maps each categorical column to its encoder classes so the
+    predictor can encode requests without unpickling the LabelEncoders.
+    model_sha256 is the digest of the pickle the forest came from; loaders
+    compare it to tell a stale export from a current one.
+    """
+    n_classes = len(model.classes_)
+    trees = [estimator.tree_ for estimator in model.estimators_]
+
+    feature, threshold, children_left, children_right, value, roots = [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        # Leaves point at themselves, so every sample can take max_depth steps
+        # without checking whether it already reached a leaf
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        children_left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+        children_right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+
+        # scikit-learn >= 1.4 stores class fractions, which predict_proba returns
+        # as they are; older versions stored counts and normalized them
+        proba = tree.value[:, 0, :n_classes]
+        normalizer = proba.sum(axis=1)
+        if not np.allclose(normalizer, 1.0):
+            normalizer[normalizer == 0.0] = 1.0
+            proba = proba / normalizer[:, np.newaxis]
+        value.append(proba)
+
+        roots.append(offset)
+        offset += tree.node_count
+
+    arrays = {
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'children_left': np.concatenate(children_left).astype(np.int32),
+        'children_right': np.concatenate(children_right).astype(np.int32),
+        'value': np.concatenate(value).astype(np.float64),
+        'roots': np.asarray(roots, dtype=np.int32)
+    }
+
+    os.makedirs(output_dir, exist_ok=True)
+    for name in ARRAY_NAMES:
+        save_array(output_dir, name, arrays[name])
+
+    manifest = {
+        'format_version': FOREST_FORMAT_VERSION,
+        'model_sha256': model_sha256,
+        'n_trees': len(trees),
+        'n_nodes': offset,
+        'max_depth': max(tree.max_depth for tree in trees),
+        'classes': [str(label) for label in model.classes_],
+        'feature_names': list(feature_names),
+        'label_classes': {column: [str(label) for label in classes] for column, classes in label_classes.items()}
+    }
+
+    # The manifest goes last: a forest is only picked up once all its arrays exist
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+class CompactForest:
+    """NumPy stand-in for the fitted forest: classes_ and predict_proba"""
+
+    def __init__(self, manifest, arrays):
+        self.manifest = manifest
+        self.classes_ = np.array(manifest['classes'], dtype=object)
+        self.n_trees = manifest['n_trees']
+        self.max_depth = manifest['max_depth']
+        self.feature_names = manifest['feature_names']
+        self.label_classes = manifest['label_classes']
+
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.children_left = arrays['children_left']
+        self.children_right = arrays['children_right']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+
+    @classmethod
+    def load(cls, forest_dir, model_sha256=None, mmap_mode='r'):
+        """Open an exported forest, or return None when it is missing or stale"""
+        try:
+            with open(os.path.join(forest_dir, MANIFEST_FILE), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if manifest.get('format_version') != FOREST_FORMAT_VERSION:
+            return None
+        if model_sha256 is not None and manifest.get('model_sha256') != model_sha256:
+            return None
+
+        try:
+            arrays = {
+                name: np.load(os.path.join(forest_dir, f'{name}.npy'), mmap_mode=mmap_mode)
+                for name in ARRAY_NAMES
+            }
+        except (OSError, ValueError):
+            return None
+
+        if len(arrays['roots']) != manifest['n_trees'] or len(arrays['feature']) != manifest['n_nodes']:
+            return None
+        return cls(manifest, arrays)
+
+    def apply(self, X):
+        """Leaf node of every (sample, tree) pair"""
+        n_samples = len(X)
+        nodes = np.broadcast_to(self.roots, (n_samples, self.n_trees)).copy()
+        rows = np.arange(n_samples)[:, np.newaxis]
+
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        """Mean of the per-tree class probabilities, as RandomForestClassifier.predict_proba"""
+        # scikit-learn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected {len(self.feature_names)} features per sample")
+        if np.isnan(X).any():
+            raise ValueError("Input X contains NaN.")
+
+        leaves = self.apply(X)
+
+        # Summed tree by tree, in the same order as scikit-learn, so the
+        # floating-point result matches it exactly
+        proba = np.zeros((len(X), len(self.classes_)), dtype=np.float64)
+        for tree in range(self.n_trees):
+            proba += self.value[leaves[:, tree]]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
@@ -1,43 +1,237 @@
-import pandas as pd
 import numpy as np
-import joblib
+import hashlib
+import io
 import json
+import os
 import sys
+import threading
 import warnings
+from collections import OrderedDict
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from instrumentation import metrics
+from compact_forest import CompactForest, export_forest
+
+# Default value for every model input the caller leaves out
+DEFAULT_USER_DATA = {
+    'age': 25,
+    'gender': 'Male',
+    'educationLevel': 'bachelors',
+    'interests': 'Programming',
+    'personalityType': 'Ambivert',
+    'personalityScore': 75,
+    'cognitiveScore': 80,
+    'skillsScore': 80,
+    'situationalScore': 75,
+    'valuesScore': 75
+}
+
+CATEGORICAL_COLUMNS = ['gender', 'educationLevel', 'interests', 'personalityType']
+
+MODEL_FILE = 'best_model_2.pkl'
+# Array-backed export of MODEL_FILE (see compact_forest.py), relative to model_path
+FOREST_DIR = 'artifacts'
+
+# How to encode a category the label encoders never saw:
+#   'first' - use code 0, the first class of the encoder (original behaviour)
+#   'error' - reject the request
+UNKNOWN_CATEGORY_POLICIES = ('first', 'error')
+
+# Predictions kept in memory per process; CACHE_FILE_ENV also persists them
+PREDICTION_CACHE_SIZE = 4096
+CACHE_FILE_ENV = 'ML_MODEL2_CACHE_FILE'
+
+
+class PredictionCache:
+    """Bounded LRU of class probabilities keyed on (model version, feature vector)
+    
+    Keys carry the sha256 of best_model_2.pkl, so entries computed by an older
+    model never match once the file changes, and stale entries are dropped
+    when a persisted cache is loaded.
+    """
+    
+    def __init__(self, model_version, max_size=PREDICTION_CACHE_SIZE, cache_file=None):
+        self.model_version = model_version
+        self.max_size = max_size
+        self.cache_file = cache_file
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        # The model server answers requests from several threads
+        self.lock = threading.Lock()
+        
+        if cache_file:
+            self.load()
+    
+    def key(self, feature_vector):
+        return (self.model_version, np.asarray(feature_vector, dtype=np.float64).tobytes())
+    
+    def get(self, key):
+        with self.lock:
+            probabilities = self.entries.get(key)
+            if probabilities is None:
+                self.misses += 1
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        metrics.increment('model2.cache_hits' if probabilities is not None else 'model2.cache_misses')
+        return probabilities
+    
+    def put(self, key, probabilities):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = probabilities
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+            self.dirty = True
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'model_version': self.model_version
+        }
+    
+    def load(self):
+        """Read the persisted cache, keeping only entries for the current model"""
+        import joblib
+        
+        try:
+            entries = joblib.load(self.cache_file)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"WARNING: Ignoring unreadable prediction cache: {e}", file=sys.stderr)
+            return
+        
+        for key, probabilities in entries:
+            if key[0] == self.model_version:
+                self.entries[key] = probabilities
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+    
+    def save(self):
+        """Persist the cache when it changed; written atomically"""
+        if not (self.cache_file and self.dirty):
+            return
+        import joblib
+        
+        with self.lock:
+            entries = list(self.entries.items())
+        
+        # Per process: concurrent CLI runs share the cache file
+        tmp_path = f'{self.cache_file}.{os.getpid()}.tmp'
+        try:
+            joblib.dump(entries, tmp_path)
+            os.replace(tmp_path, self.cache_file)
+            self.dirty = False
+        except OSError as e:
+            print(f"WARNING: Could not save prediction cache: {e}", file=sys.stderr)
+
+
 class CareerPredictor:
-    def __init__(self, model_path='ml_models/model2'):
-        """Initialize the career predictor with saved models"""
+    def __init__(self, model_path='ml_models/model2', unknown_category='first',
+                 cache_size=PREDICTION_CACHE_SIZE, cache_file=None, rebuild=False):
+        """Initialize the career predictor with saved models
+        
+        cache_file persists the prediction cache between runs; it defaults to
+        the ML_MODEL2_CACHE_FILE environment variable and is off when unset.
+        rebuild ignores the compact forest and re-exports it from the pickle.
+        """
+        if unknown_category not in UNKNOWN_CATEGORY_POLICIES:
+            raise ValueError(f"unknown_category must be one of {UNKNOWN_CATEGORY_POLICIES}")
+        self.unknown_category = unknown_category
+        
         try:
-            # Load your trained models (from your .ipynb)
-            self.model = joblib.load(f'{model_path}/best_model_2.pkl')
-            self.label_encoders = joblib.load(f'{model_path}/label_encoders.pkl')
-            self.feature_names = joblib.load(f'{model_path}/feature_names.pkl')
+            with metrics.stage('load'):
+                with open(f'{model_path}/{MODEL_FILE}', 'rb') as f:
+                    model_bytes = f.read()
+                self.model_version = hashlib.sha256(model_bytes).hexdigest()
+                
+                # Serve from the compact export when it matches the pickle;
+                # otherwise unpickle and refresh the export for next time
+                self.model = None if rebuild else CompactForest.load(f'{model_path}/{FOREST_DIR}', self.model_version)
+                if self.model is not None:
+                    self.feature_names = self.model.feature_names
+                    label_classes = self.model.label_classes
+                else:
+                    label_classes = self.load_pickled_model(model_path, model_bytes)
+                self.compile_label_encoders(label_classes)
+                
+                if cache_file is None:
+                    cache_file = os.environ.get(CACHE_FILE_ENV, '').strip() or None
+                self.prediction_cache = PredictionCache(self.model_version, cache_size, cache_file)
             self.model_loaded = True
-            print("SUCCESS: Career prediction model loaded successfully!")
+            print("SUCCESS: Career prediction model loaded successfully!", file=sys.stderr)
         except Exception as e:
-            print(f"ERROR: Error loading model: {e}")
+            print(f"ERROR: Error loading model: {e}", file=sys.stderr)
             self.model_loaded = False
     
+    def load_pickled_model(self, model_path, model_bytes):
+        """Load the scikit-learn forest and encoders; returns the encoder classes
+        
+        Also exports the compact forest so later loads skip joblib and
+        scikit-learn entirely. Export failures only cost the next load time.
+        """
+        # joblib (and scikit-learn, via the pickles) is only needed here
+        import joblib
+        
+        # Load your trained models (from your .ipynb)
+        self.model = joblib.load(io.BytesIO(model_bytes))
+        label_encoders = joblib.load(f'{model_path}/label_encoders.pkl')
+        self.feature_names = joblib.load(f'{model_path}/feature_names.pkl')
+        label_classes = {column: label_encoders[column].classes_ for column in CATEGORICAL_COLUMNS}
+        
+        try:
+            export_forest(self.model, self.feature_names, label_classes, self.model_version, f'{model_path}/{FOREST_DIR}')
+        except (OSError, AttributeError) as e:
+            print(f"WARNING: Could not export compact forest: {e}", file=sys.stderr)
+        
+        return label_classes
+    
+    def compile_label_encoders(self, label_classes):
+        """Turn the LabelEncoder classes into plain lookup tables
+        
+        category_codes maps value -> code for constant-time single lookups and
+        category_classes keeps the sorted classes for whole-column searchsorted,
+        so requests never go through LabelEncoder.transform validation.
+        """
+        self.category_codes = {}
+        self.category_classes = {}
+        
+        for column in CATEGORICAL_COLUMNS:
+            classes = np.asarray(label_classes[column]).astype(str)
+            self.category_classes[column] = classes
+            self.category_codes[column] = {value: code for code, value in enumerate(classes.tolist())}
+    
+    def unknown_category_code(self, column, values):
+        """Code for categories the encoder never saw, according to the policy"""
+        if self.unknown_category == 'error':
+            raise ValueError(f"Unknown {column}: {values!r}")
+        return 0
+    
+    def encode_category(self, column, value):
+        """Encode a single categorical value"""
+        try:
+            return self.category_codes[column][value]
+        except (KeyError, TypeError):
+            return self.unknown_category_code(column, value)
+    
     def encode_categorical_data(self, data):
-        """Encode categorical variables using saved label encoders"""
+        """Encode categorical variables using the compiled label encoder tables"""
         encoded_data = data.copy()
         
-        categorical_columns = ['gender', 'educationLevel', 'interests', 'personalityType']
-        
-        for column in categorical_columns:
+        for column in CATEGORICAL_COLUMNS:
             if column in encoded_data:
-                try:
-                    # Handle new/unknown categories
-                    if encoded_data[column] in self.label_encoders[column].classes_:
-                        encoded_data[column] = self.label_encoders[column].transform([encoded_data[column]])[0]
-                    else:
-                        # Assign most common category for unknown values
-                        encoded_data[column] = 0
-                except Exception as e:
-                    print(f"Warning: Error encoding {column}: {e}")
-                    encoded_data[column] = 0
+                encoded_data[column] = self.encode_category(column, encoded_data[column])
         
         return encoded_data
     
@@ -48,38 +242,34 @@ class CareerPredictor:
         
         try:
             # Prepare input data
-            input_data = {
-                'age': user_data.get('age', 25),
-                'gender': user_data.get('gender', 'Male'),
-                'educationLevel': user_data.get('educationLevel', 'bachelors'),
-                'interests': user_data.get('interests', 'Programming'),
-                'personalityType': user_data.get('personalityType', 'Ambivert'),
-                'personalityScore': user_data.get('personalityScore', 75),
-                'cognitiveScore': user_data.get('cognitiveScore', 80),
-                'skillsScore': user_data.get('skillsScore', 80),
-                'situationalScore': user_data.get('situationalScore', 75),
-                'valuesScore': user_data.get('valuesScore', 75)
-            }
-            
-            print(f"Processing user data: {input_data}") 
+            input_data = {key: user_data.get(key, default) for key, default in DEFAULT_USER_DATA.items()}
             
-            # Encode categorical variables
-            encoded_data = self.encode_categorical_data(input_data)
+            print(f"Processing user data: {input_data}", file=sys.stderr)
             
-            # Create feature vector in correct order
-            feature_vector = []
-            for feature in self.feature_names:
-                feature_vector.append(encoded_data[feature])
+            with metrics.stage('encode'):
+                # Encode categorical variables
+                encoded_data = self.encode_categorical_data(input_data)
+                
+                # Create feature vector in correct order
+                feature_vector = []
+                for feature in self.feature_names:
+                    feature_vector.append(encoded_data[feature])
+                
+                # Reshape for single prediction
+                feature_vector = np.array(feature_vector).reshape(1, -1)
             
-            # Reshape for single prediction
-            feature_vector = np.array(feature_vector).reshape(1, -1)
-            
-            # Make prediction
-            prediction = self.model.predict(feature_vector)[0]
-            probabilities = self.model.predict_proba(feature_vector)[0]
+            # Make prediction; predict() is the argmax of predict_proba, so
+            # only the probabilities are computed (or reused from the cache)
+            cache_key = self.prediction_cache.key(feature_vector[0])
+            probabilities = self.prediction_cache.get(cache_key)
+            if probabilities is None:
+                with metrics.stage('predict'):
+                    probabilities = self.model.predict_proba(feature_vector)[0]
+                self.prediction_cache.put(cache_key, probabilities)
+            prediction = self.model.classes_[np.argmax(probabilities)]
             confidence = np.max(probabilities)
             
-            print(f"SUCCESS: Prediction: {prediction} (Confidence: {confidence:.3f})")
+            print(f"SUCCESS: Prediction: {prediction} (Confidence: {confidence:.3f})", file=sys.stderr)
             
             return {
                 "success": True,
@@ -90,27 +280,150 @@ class CareerPredictor:
             }
             
         except Exception as e:
-            print(f"ERROR: Prediction error: {e}")
+            print(f"ERROR: Prediction error: {e}", file=sys.stderr)
             return {"error": str(e), "success": False}
+    
+    def encode_categorical_column(self, column, values):
+        """Encode a whole column of categorical values"""
+        classes = self.category_classes[column]
+        values = np.asarray(values, dtype=object).astype(str)
+        
+        # classes are sorted, so searchsorted gives the LabelEncoder code
+        positions = np.minimum(np.searchsorted(classes, values), len(classes) - 1)
+        known = classes[positions] == values
+        if known.all():
+            return positions
+        
+        unknown_code = self.unknown_category_code(column, np.unique(values[~known]).tolist())
+        return np.where(known, positions, unknown_code)
+    
+    def build_feature_matrix(self, user_records):
+        """Build the (users x features) matrix from user dicts or a DataFrame"""
+        if hasattr(user_records, 'columns'):
+            # DataFrame: missing columns and empty cells fall back to defaults
+            n_users = len(user_records)
+            columns = {
+                key: (user_records[key].fillna(default).tolist() if key in user_records.columns else [default] * n_users)
+                for key, default in DEFAULT_USER_DATA.items()
+            }
+        else:
+            columns = {
+                key: [record.get(key, default) for record in user_records]
+                for key, default in DEFAULT_USER_DATA.items()
+            }
+        
+        for column in CATEGORICAL_COLUMNS:
+            columns[column] = self.encode_categorical_column(column, columns[column])
+        
+        return np.column_stack([np.asarray(columns[feature], dtype=float) for feature in self.feature_names])
+    
+    def predict_batch(self, user_records):
+        """Predict career clusters for many users with a single predict_proba call
+        
+        Accepts a list of user dicts or a DataFrame with the same fields as
+        predict_career and returns one result dict per user, in input order.
+        """
+        n_users = len(user_records)
+        if not self.model_loaded:
+            return [{"error": "Model not loaded", "success": False} for _ in range(n_users)]
+        if n_users == 0:
+            return []
+        
+        try:
+            with metrics.stage('encode'):
+                feature_matrix = self.build_feature_matrix(user_records)
+            
+            # Only distinct vectors missing from the prediction cache go through the forest
+            cache_keys = [self.prediction_cache.key(row) for row in feature_matrix]
+            probabilities = np.empty((n_users, len(self.model.classes_)))
+            missing = {}
+            for i, key in enumerate(cache_keys):
+                row = None if key in missing else self.prediction_cache.get(key)
+                if row is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    probabilities[i] = row
+            
+            # predict() is the argmax of predict_proba, so derive it instead of a second pass
+            with metrics.stage('predict'):
+                if missing:
+                    rows = [positions[0] for positions in missing.values()]
+                    for (key, positions), row in zip(missing.items(), self.model.predict_proba(feature_matrix[rows])):
+                        probabilities[positions] = row
+                        self.prediction_cache.put(key, row.copy())
+                best = probabilities.argmax(axis=1)
+                predictions = self.model.classes_[best]
+                confidences = probabilities[np.arange(n_users), best]
+                classes = self.model.classes_.tolist()
+            
+            print(f"SUCCESS: Batch prediction for {n_users} users", file=sys.stderr)
+            
+            with metrics.stage('format'):
+                return [
+                    {
+                        "success": True,
+                        "prediction": prediction,
+                        "confidence": confidence,
+                        "method": "RandomForest_87.5%_Accuracy",
+                        "all_probabilities": dict(zip(classes, row))
+                    }
+                    for prediction, confidence, row in zip(predictions.tolist(), confidences.tolist(), probabilities.tolist())
+                ]
+            
+        except Exception as e:
+            print(f"ERROR: Batch prediction error: {e}", file=sys.stderr)
+            return [{"error": str(e), "success": False} for _ in range(n_users)]
+
+def export_compact_model(model_path=os.path.dirname(os.path.abspath(__file__))):
+    """Re-export the compact forest from best_model_2.pkl"""
+    predictor = CareerPredictor(model_path=model_path, cache_size=0, rebuild=True)
+    if not predictor.model_loaded:
+        return {"success": False, "error": "Model not loaded"}
+    
+    forest = CompactForest.load(f'{model_path}/{FOREST_DIR}', predictor.model_version)
+    if forest is None:
+        return {"success": False, "error": "Compact forest export failed"}
+    return {
+        "success": True,
+        "forest_dir": os.path.join(model_path, FOREST_DIR),
+        "model_sha256": predictor.model_version,
+        "n_trees": forest.n_trees,
+        "n_nodes": forest.manifest['n_nodes']
+    }
 
 def main():
     """Main function for command line usage"""
     if len(sys.argv) < 2:
         print("Usage: python career_predictor.py <user_data_json>")
+        print("       python career_predictor.py export-forest")
         return
     
-    # Initialize predictor
-    predictor = CareerPredictor()
+    if sys.argv[1] == 'export-forest':
+        print(json.dumps(export_compact_model()))
+        return
     
     # Parse user data
     try:
-        user_data = json.loads(sys.argv[1])
-        
-        # Make prediction
-        result = predictor.predict_career(user_data)
-        
-        # Output result as JSON
-        print(json.dumps(result))
+        with metrics.request('model2'):
+            with metrics.stage('parse'):
+                user_data = json.loads(sys.argv[1])
+            
+            # Prefer the warm model server when one is configured
+            from model_client import call_model_server
+            
+            with metrics.stage('forward'):
+                result = call_model_server('/model2', user_data)
+            if result is None:
+                # Initialize predictor and make prediction locally
+                predictor = CareerPredictor()
+                result = predictor.predict_career(user_data)
+                if predictor.model_loaded:
+                    predictor.prediction_cache.save()
+            
+            # Output result as JSON
+            with metrics.stage('serialize'):
+                output = json.dumps(result)
+        print(output)
         
     except Exception as e:
         error_result = {"error": str(e), "success": False}
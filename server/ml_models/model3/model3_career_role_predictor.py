@@ -4,74 +4,344 @@ Model 3: Career Role Recommendation System
 Hybrid KNN + Cosine Similarity Approach
 """
 
-import pandas as pd
 import numpy as np
+import hashlib
+import io
 import json
+import os
+import re
 import sys
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.neighbors import NearestNeighbors
-from sklearn.preprocessing import LabelEncoder, StandardScaler
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from instrumentation import metrics
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(MODEL_DIR, '..', 'datasets', 'DS3_Career_Role_Recommendation.csv')
+
+# Prebuilt artifact bundle (see build-artifacts); bump the version whenever
+# the contents of the bundle or the training logic change
+ARTIFACTS_DIR = os.path.join(MODEL_DIR, 'artifacts')
+ARTIFACT_VERSION = 9
+MANIFEST_FILE = 'manifest.json'
+BUNDLE_FILE = 'model3_bundle.pkl'
+# Ranking index only, enough to serve requests: cluster slices as JSON,
+# scores, education codes and role payloads as .npy arrays that every
+# worker memory-maps read-only, so extra workers share the same pages
+SERVING_INDEX_FILE = 'model3_serving_index.json'
+# Serving array attribute -> file; skill_* are the inverted skill index
+# (per-term posting lists of role positions and TF-IDF weights), role_*
+# the role records as pre-encoded JSON bytes (see encode_role_payloads)
+SERVING_ARRAYS = {
+    'serving_scores': 'model3_serving_scores.npy',
+    'serving_education': 'model3_serving_education.npy',
+    'skill_offsets': 'model3_skill_offsets.npy',
+    'skill_roles': 'model3_skill_roles.npy',
+    'skill_weights': 'model3_skill_weights.npy',
+    'role_payloads': 'model3_role_payloads.npy',
+    'role_payload_offsets': 'model3_role_payload_offsets.npy'
+}
+SERVING_FILES = (SERVING_INDEX_FILE, *SERVING_ARRAYS.values())
+
+# Rows of the serving score matrix; the component scores are stored rounded
+# and copied into each recommendation under these names
+BASE_SCORE_ROW = 0
+COMPONENT_SCORES = ('content_score', 'collaborative_score', 'popularity_score')
+# Education code of roles whose requirement is not a string (matches no query)
+UNKNOWN_EDUCATION_CODE = -2
+
+# Roles returned by a skills search unless the request asks for top_n
+DEFAULT_SEARCH_TOP_N = 10
+BUNDLE_ATTRIBUTES = (
+    'df', 'skills_tfidf_matrix', 'content_scores', 'collab_scores', 'collab_radii',
+    'knn_model', 'scaler', 'tfidf_vectorizer', 'label_encoders', 'skill_term_counts'
+)
+
+# CSV column -> column name used by the model
+CSV_COLUMNS = {
+    'CareerCluster': 'Career_Cluster',
+    'CareerRole': 'Career_Role',
+    'RequiredSkills': 'Required_Skills',
+    'EducationLevelRequired': 'Education_Level_Required',
+    'AvgSalaryRange': 'Avg_Salary_Range',
+    'JobOutlook': 'Job_Outlook',
+    'GrowthPath': 'Growth_Path',
+    'LearningResources': 'Learning_Resources',
+    'EntranceExams': 'Entrance_Exams',
+    'FieldforAdmission': 'Field_for_Admission',
+    'OnlineResourcesLinks': 'Online_Resources_Links',
+    'FreeCertifications': 'Free_Certifications'
+}
+
+# Catalogue updates identify a role by its cluster and name
+ROLE_KEY = ['Career_Cluster', 'Career_Role']
+# Share of the fitted skill vocabulary allowed to fall out of (or be pushed
+# out by) the catalogue's top terms before an update retrains from scratch
+VOCABULARY_DRIFT_THRESHOLD = 0.05
+
+# Features the KNN collaborative filter compares roles on
+COLLAB_FEATURES = ['Education_Encoded', 'Salary_Midpoint', 'Outlook_Encoded', 'Skills_Count']
+
+# How collaborative scores are computed at build time: 'exact' queries the
+# KNN index once per role, 'unique' once per distinct feature row in each
+# cluster and shares the result (same scores, bounded query count)
+NEIGHBOR_BACKENDS = ('exact', 'unique')
+DEFAULT_NEIGHBOR_BACKEND = 'unique'
+
+# Popularity weight of each Job_Outlook value (unknown outlooks count as 0.5)
+OUTLOOK_WEIGHTS = {'Low': 0.2, 'Medium': 0.5, 'High': 0.8, 'Very High': 1.0}
+
+# Response field -> CSV column for each recommended role, in response order
+RECORD_COLUMNS = {
+    'career_role': 'Career_Role',
+    'career_cluster': 'Career_Cluster',
+    'required_skills': 'Required_Skills',
+    'education_level_required': 'Education_Level_Required',
+    'avg_salary_range': 'Avg_Salary_Range',
+    'job_outlook': 'Job_Outlook',
+    'growth_path': 'Growth_Path',
+    'learning_resources': 'Learning_Resources',
+    'entrance_exams': 'Entrance_Exams',
+    'field_for_admission': 'Field_for_Admission',
+    'online_resources_links': 'Online_Resources_Links',
+    'free_certifications': 'Free_Certifications'
+}
+
+# Record field -> its slot in a role payload
+RECORD_FIELDS = list(RECORD_COLUMNS)
+FIELD_SLOTS = {field: slot for slot, field in enumerate(RECORD_FIELDS)}
+# Always part of a recommendation, whatever "fields" asks for
+ROLE_ID_FIELDS = ('career_role', 'career_cluster')
+SCORE_FIELDS = ('rank', 'confidence_score', *COMPONENT_SCORES, 'match_score', 'matched_skills')
+SCORE_KEYS = {field: f', {json.dumps(field)}: '.encode('utf-8') for field in SCORE_FIELDS}
+
+# Model 2 cluster names that differ from the CSV cluster names
+CLUSTER_MAPPING = {
+    'Engineering': 'STEM',
+    'Legal': 'Law',
+    'Law': 'Legal'
+}
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file, or None if it cannot be read"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def write_atomic(path, data):
+    """Write bytes to path without readers ever seeing a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
 class CareerRolePredictor:
-    def __init__(self):
+    def __init__(self, artifacts_dir=ARTIFACTS_DIR, rebuild=False, neighbor_backend=DEFAULT_NEIGHBOR_BACKEND):
+        if neighbor_backend not in NEIGHBOR_BACKENDS:
+            raise ValueError(f"neighbor_backend must be one of {NEIGHBOR_BACKENDS}")
+        self.neighbor_backend = neighbor_backend
         self.df = None
-        self.content_sim_matrix = None
+        self.skills_tfidf_matrix = None
+        self.content_scores = None
+        self.collab_scores = None
+        self.collab_radii = None
+        self.skill_term_counts = None
         self.knn_model = None
         self.scaler = None
         self.tfidf_vectorizer = None
         self.label_encoders = {}
         self.model_loaded = False
+        self.artifacts_dir = artifacts_dir
+        self.dataset_fingerprint = None
+        self.manifest = None
+        self.cluster_positions = {}
+        self.cluster_rankings = {}
+        self.serving_index = None
+        for name in SERVING_ARRAYS:
+            setattr(self, name, None)
         
-        self.load_dataset()
-        self.train_model()
+        # Serve from the prebuilt ranking index when it is valid; fall back to
+        # the full bundle, bring that up to date when only the CSV changed,
+        # and retrain only when it is missing or stale
+        with metrics.stage('load'):
+            manifest = None if rebuild else self.read_manifest(check_dataset=False)
+            dataset_current = bool(manifest) and manifest.get('dataset_fingerprint') == file_sha256(DATASET_PATH)
+            if dataset_current and self.load_serving_artifacts(manifest):
+                return
+            
+            trained = False
+            if manifest and self.load_artifacts(manifest) and not dataset_current:
+                print("Career role CSV changed since the artifact bundle was built, updating the catalogue", file=sys.stderr)
+                if self.sync_with_dataset() is not None:
+                    self.save_artifacts()
+                    return
+                self.model_loaded = False
+            
+            if not self.model_loaded:
+                self.load_dataset()
+                self.train_model()
+                trained = True
+            
+            if self.model_loaded:
+                self.build_ranking_index()
+                if trained and self.dataset_fingerprint:
+                    self.save_artifacts()
+    
+    def read_manifest(self, check_dataset=True):
+        """Return the artifact manifest if it matches this code (and the CSV), else None"""
+        if not self.artifacts_dir:
+            return None
+        
+        try:
+            with open(os.path.join(self.artifacts_dir, MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if manifest.get('version') != ARTIFACT_VERSION:
+            print(f"Artifact bundle version {manifest.get('version')} is stale, retraining", file=sys.stderr)
+            return None
+        
+        if check_dataset and manifest.get('dataset_fingerprint') != file_sha256(DATASET_PATH):
+            print("Career role CSV changed since the artifact bundle was built, retraining", file=sys.stderr)
+            return None
+        
+        return manifest
+    
+    def read_artifact(self, file_name, expected_sha256):
+        """Read an artifact file, or return None if it is missing or fails its checksum"""
+        try:
+            with open(os.path.join(self.artifacts_dir, file_name), 'rb') as f:
+                payload = f.read()
+        except OSError:
+            return None
+        
+        if hashlib.sha256(payload).hexdigest() != expected_sha256:
+            print(f"Artifact {file_name} checksum mismatch", file=sys.stderr)
+            return None
+        return payload
+    
+    def load_serving_artifacts(self, manifest):
+        """Restore just the precomputed ranking index needed to answer requests
+        
+        The index is JSON plus memory-mapped .npy arrays: nothing is unpickled
+        and serving from it never imports pandas or scikit-learn.
+        """
+        checksums = manifest.get('serving_sha256') or {}
+        payloads = {name: self.read_artifact(name, checksums.get(name)) for name in SERVING_FILES}
+        if any(payload is None for payload in payloads.values()):
+            return False
+        
+        try:
+            self.serving_index = json.loads(payloads[SERVING_INDEX_FILE])
+            for name, file_name in SERVING_ARRAYS.items():
+                setattr(self, name, np.load(os.path.join(self.artifacts_dir, file_name), mmap_mode='r'))
+            self.index_rankings()
+        except Exception as e:
+            print(f"Error loading serving artifacts: {e}", file=sys.stderr)
+            return False
+        
+        self.dataset_fingerprint = manifest['dataset_fingerprint']
+        self.manifest = manifest
+        self.model_loaded = True
+        print(f"Serving artifacts loaded with {manifest.get('career_roles')} career roles", file=sys.stderr)
+        return True
+    
+    def load_artifacts(self, manifest):
+        """Restore the trained model from the artifact bundle"""
+        payload = self.read_artifact(BUNDLE_FILE, manifest.get('bundle_sha256'))
+        if payload is None:
+            return False
+        
+        try:
+            import joblib
+            
+            # Checksum verified; map the bundle's arrays instead of copying them
+            bundle = joblib.load(os.path.join(self.artifacts_dir, BUNDLE_FILE), mmap_mode='r')
+            for name in BUNDLE_ATTRIBUTES:
+                setattr(self, name, bundle[name])
+        except Exception as e:
+            print(f"Error loading artifact bundle: {e}", file=sys.stderr)
+            return False
+        
+        self.dataset_fingerprint = manifest['dataset_fingerprint']
+        self.manifest = manifest
+        self.model_loaded = True
+        print(f"Artifact bundle loaded with {len(self.df)} career roles", file=sys.stderr)
+        return True
+    
+    def save_artifacts(self):
+        """Write the trained model and its ranking index to versioned, checksummed artifacts"""
+        try:
+            import joblib
+            
+            os.makedirs(self.artifacts_dir, exist_ok=True)
+            
+            buffer = io.BytesIO()
+            joblib.dump({name: getattr(self, name) for name in BUNDLE_ATTRIBUTES}, buffer)
+            payload = buffer.getvalue()
+            serving_payloads = {
+                SERVING_INDEX_FILE: json.dumps(self.serving_index).encode('utf-8'),
+                **{file_name: npy_bytes(getattr(self, name)) for name, file_name in SERVING_ARRAYS.items()}
+            }
+            
+            manifest = {
+                'version': ARTIFACT_VERSION,
+                'dataset_fingerprint': self.dataset_fingerprint,
+                'bundle_sha256': hashlib.sha256(payload).hexdigest(),
+                'serving_sha256': {name: hashlib.sha256(data).hexdigest() for name, data in serving_payloads.items()},
+                'neighbor_backend': self.neighbor_backend,
+                'career_roles': len(self.df)
+            }
+            
+            # Artifacts first, manifest last: the manifest is what marks them valid
+            write_atomic(os.path.join(self.artifacts_dir, BUNDLE_FILE), payload)
+            for name, data in serving_payloads.items():
+                write_atomic(os.path.join(self.artifacts_dir, name), data)
+            write_atomic(os.path.join(self.artifacts_dir, MANIFEST_FILE), json.dumps(manifest, indent=2).encode('utf-8'))
+            print(f"Artifact bundle saved to {self.artifacts_dir}", file=sys.stderr)
+            self.manifest = manifest
+            return manifest
+            
+        except Exception as e:
+            print(f"Error saving artifact bundle: {e}", file=sys.stderr)
+            return None
     
     def load_dataset(self):
         """Load career roles from CSV file"""
-        import os
+        import pandas as pd
         
-        # Path to your existing CSV file
-        csv_path = os.path.join(os.path.dirname(__file__), '..', 'datasets', 'DS3_Career_Role_Recommendation.csv')
+        csv_path = DATASET_PATH
         
         try:
             # Load the CSV file
+            self.dataset_fingerprint = file_sha256(csv_path)
             self.df = pd.read_csv(csv_path)
             
-            # Standardize column names (your CSV uses different casing)
-            column_mapping = {
-                'CareerCluster': 'Career_Cluster',
-                'CareerRole': 'Career_Role',
-                'RequiredSkills': 'Required_Skills',
-                'EducationLevelRequired': 'Education_Level_Required',
-                'AvgSalaryRange': 'Avg_Salary_Range',
-                'JobOutlook': 'Job_Outlook',
-                'GrowthPath': 'Growth_Path',
-                'LearningResources': 'Learning_Resources',
-                'EntranceExams': 'Entrance_Exams',
-                'FieldforAdmission': 'Field_for_Admission',
-                'OnlineResourcesLinks': 'Online_Resources_Links',
-                'FreeCertifications': 'Free_Certifications'
-            }
-            
-            # Rename columns to match expected format
-            self.df.rename(columns=column_mapping, inplace=True)
+            # Rename columns to match expected format (your CSV uses different casing)
+            self.df.rename(columns=CSV_COLUMNS, inplace=True)
             
-            print(f"Dataset loaded with {len(self.df)} career roles from CSV")
-            print(f"Available clusters: {self.df['Career_Cluster'].unique().tolist()}")
+            print(f"Dataset loaded with {len(self.df)} career roles from CSV", file=sys.stderr)
+            print(f"Available clusters: {self.df['Career_Cluster'].unique().tolist()}", file=sys.stderr)
             
         except FileNotFoundError:
-            print(f"ERROR: CSV file not found at {csv_path}")
-            print("Creating fallback dataset...")
+            self.dataset_fingerprint = None
+            print(f"ERROR: CSV file not found at {csv_path}", file=sys.stderr)
+            print("Creating fallback dataset...", file=sys.stderr)
             self._create_fallback_dataset()
         except Exception as e:
-            print(f"ERROR loading CSV: {e}")
-            print("Creating fallback dataset...")
+            self.dataset_fingerprint = None
+            print(f"ERROR loading CSV: {e}", file=sys.stderr)
+            print("Creating fallback dataset...", file=sys.stderr)
             self._create_fallback_dataset()
 
     def _create_fallback_dataset(self):
         """Fallback: create minimal dataset if CSV loading fails"""
+        import pandas as pd
+        
         data = []
         
         # Minimal fallback data
@@ -97,35 +367,21 @@ class CareerRolePredictor:
                 })
         
         self.df = pd.DataFrame(data)
-        print(f"Fallback dataset created with {len(self.df)} career roles")
+        print(f"Fallback dataset created with {len(self.df)} career roles", file=sys.stderr)
 
 
     
     def train_model(self):
+        # Training-only dependencies, kept out of the serving import graph
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.neighbors import NearestNeighbors
+        from sklearn.preprocessing import LabelEncoder, StandardScaler, normalize
+        
         try:
-            self.df['Skills_Text'] = self.df['Required_Skills'].fillna('')
-            self.df['Skills_List'] = self.df['Required_Skills'].apply(lambda x: x.split('; ') if pd.notna(x) else [])
-            
-            def extract_salary_midpoint(salary_str):
-                try:
-                    if pd.isna(salary_str):
-                        return 10
-                    numbers = salary_str.split(' ')[0].split('-')
-                    if len(numbers) == 2:
-                        return (float(numbers[0]) + float(numbers[1])) / 2
-                    return 10
-                except:
-                    return 10
-            
-            self.df['Salary_Midpoint'] = self.df['Avg_Salary_Range'].apply(extract_salary_midpoint)
-            
             self.label_encoders['education'] = LabelEncoder()
             self.label_encoders['outlook'] = LabelEncoder()
             self.label_encoders['cluster'] = LabelEncoder()
-            
-            self.df['Education_Encoded'] = self.label_encoders['education'].fit_transform(self.df['Education_Level_Required'].fillna('Graduation'))
-            self.df['Outlook_Encoded'] = self.label_encoders['outlook'].fit_transform(self.df['Job_Outlook'].fillna('Medium'))
-            self.df['Cluster_Encoded'] = self.label_encoders['cluster'].fit_transform(self.df['Career_Cluster'])
+            self.df = self.prepare_role_features(self.df, fit=True)
             
             self.tfidf_vectorizer = TfidfVectorizer(
                 max_features=200,
@@ -135,11 +391,15 @@ class CareerRolePredictor:
                 max_df=0.95
             )
             
-            skills_tfidf_matrix = self.tfidf_vectorizer.fit_transform(self.df['Skills_Text'])
-            self.content_sim_matrix = cosine_similarity(skills_tfidf_matrix)
+            # Unit-length rows, as cosine similarity would normalize them. Fit,
+            # then transform as catalogue updates do: fit_transform can round
+            # differently, and rows must not depend on how they were added
+            self.tfidf_vectorizer.fit(self.df['Skills_Text'])
+            self.skills_tfidf_matrix = normalize(self.tfidf_vectorizer.transform(self.df['Skills_Text']))
+            self.skill_term_counts = self.count_skill_terms(self.df['Skills_Text'])
+            self.content_scores = self.compute_content_scores()
             
-            self.df['Skills_Count'] = self.df['Skills_List'].apply(len)
-            collab_features = self.df[['Education_Encoded', 'Salary_Midpoint', 'Outlook_Encoded', 'Skills_Count']].values
+            collab_features = self.df[COLLAB_FEATURES].values
             
             self.scaler = StandardScaler()
             collab_features_scaled = self.scaler.fit_transform(collab_features)
@@ -150,158 +410,931 @@ class CareerRolePredictor:
                 algorithm='auto'
             )
             self.knn_model.fit(collab_features_scaled)
+            self.collab_scores, self.collab_radii = self.compute_collaborative_scores(collab_features_scaled)
             
             self.model_loaded = True
-            print("Model training completed successfully")
+            print("Model training completed successfully", file=sys.stderr)
             
         except Exception as e:
-            print(f"Error training model: {e}")
+            print(f"Error training model: {e}", file=sys.stderr)
             self.model_loaded = False
     
+    def prepare_role_features(self, df, fit=False):
+        """Add the derived columns the model uses to a frame of catalogue rows
+        
+        fit=True fits the label encoders; otherwise the fitted ones are reused
+        (and raise ValueError on labels they have not seen).
+        """
+        df = df.copy()
+        df['Skills_Text'] = df['Required_Skills'].fillna('')
+        df['Skills_List'] = [skills.split('; ') if isinstance(skills, str) else [] for skills in df['Required_Skills']]
+        df['Salary_Midpoint'] = df['Avg_Salary_Range'].apply(salary_midpoint)
+        
+        encoded_columns = (
+            ('Education_Encoded', 'education', df['Education_Level_Required'].fillna('Graduation')),
+            ('Outlook_Encoded', 'outlook', df['Job_Outlook'].fillna('Medium')),
+            ('Cluster_Encoded', 'cluster', df['Career_Cluster'])
+        )
+        for column, encoder_name, values in encoded_columns:
+            encoder = self.label_encoders[encoder_name]
+            df[column] = encoder.fit_transform(values) if fit else encoder.transform(values)
+        
+        df['Skills_Count'] = df['Skills_List'].apply(len)
+        return df
+    
+    def count_skill_terms(self, texts):
+        """Corpus term counts and document counts of every analyzer term, fitted or not
+        
+        Kept up to date by catalogue updates so vocabulary drift can be
+        measured without refitting the vectorizer.
+        """
+        from collections import Counter
+        
+        analyzer = self.tfidf_vectorizer.build_analyzer()
+        term_counts, document_counts = Counter(), Counter()
+        for text in texts:
+            terms = analyzer(text)
+            term_counts.update(terms)
+            document_counts.update(set(terms))
+        return {'terms': term_counts, 'documents': document_counts}
+    
+    def compute_content_scores(self, clusters=None):
+        """Mean cosine similarity of every role's skills to the roles in its cluster
+        
+        Rows of skills_tfidf_matrix have unit length, so the mean similarity of
+        a role to its cluster is its dot product with the cluster's mean row.
+        That gives the row means of each block of the role x role similarity
+        matrix in time and memory linear in the catalogue size, without
+        materializing any block. clusters limits the work to those clusters;
+        the other roles keep their current scores.
+        """
+        content_scores = np.zeros(len(self.df)) if clusters is None else np.array(self.content_scores, dtype=float)
+        
+        for career_cluster, cluster_positions in self.df.groupby('Career_Cluster', sort=False).indices.items():
+            if clusters is not None and career_cluster not in clusters:
+                continue
+            cluster_matrix = self.skills_tfidf_matrix[cluster_positions]
+            centroid = np.asarray(cluster_matrix.mean(axis=0)).ravel()
+            # Drop float summation noise so roles with identical skill profiles tie
+            content_scores[cluster_positions] = np.round(cluster_matrix @ centroid, 12)
+        
+        return content_scores
+    
     def get_content_scores(self, cluster_indices):
         if len(cluster_indices) == 0:
             return np.array([])
         
-        cluster_sim_matrix = self.content_sim_matrix[np.ix_(cluster_indices, cluster_indices)]
-        content_scores = cluster_sim_matrix.mean(axis=1)
-        return content_scores
+        return self.content_scores[cluster_indices]
+    
+    def compute_collaborative_scores(self, collab_features_scaled, positions=None):
+        """Similarity of every role to its nearest neighbours, 1 / (1 + mean distance)
+        
+        Roles are queried cluster by cluster with as many neighbours as the
+        cluster allows, up to 10. Runs once per artifact build; requests only
+        read the stored scores. Also returns each role's distance to its
+        farthest neighbour, which tells catalogue updates whose neighbours a
+        changed role can affect. positions limits the work to those roles; the
+        others keep their current values.
+        """
+        if positions is None:
+            collab_scores, collab_radii = np.zeros(len(self.df)), np.zeros(len(self.df))
+        else:
+            collab_scores, collab_radii = np.array(self.collab_scores, dtype=float), np.array(self.collab_radii, dtype=float)
+            positions = np.asarray(positions)
+        
+        for full_cluster_positions in self.df.groupby('Career_Cluster', sort=False).indices.values():
+            n_neighbors = min(10, len(full_cluster_positions))
+            cluster_positions = full_cluster_positions if positions is None else np.intersect1d(full_cluster_positions, positions)
+            if len(cluster_positions) == 0:
+                continue
+            cluster_features = collab_features_scaled[cluster_positions]
+            
+            if self.neighbor_backend == 'unique':
+                # Roles with identical features have identical neighbour distances
+                cluster_features, inverse = np.unique(cluster_features, axis=0, return_inverse=True)
+                inverse = inverse.ravel()
+            
+            distances, _ = self.knn_model.kneighbors(cluster_features, n_neighbors=n_neighbors)
+            scores = np.array([1 / (1 + dist_array.mean()) for dist_array in distances])
+            radii = distances[:, -1]
+            
+            if self.neighbor_backend == 'unique':
+                scores, radii = scores[inverse], radii[inverse]
+            collab_scores[cluster_positions] = scores
+            collab_radii[cluster_positions] = radii
+        
+        return collab_scores, collab_radii
     
     def get_collaborative_scores(self, cluster_indices):
         if len(cluster_indices) == 0:
             return np.array([])
         
-        cluster_features = self.scaler.transform(
-            self.df.loc[cluster_indices, ['Education_Encoded', 'Salary_Midpoint', 'Outlook_Encoded', 'Skills_Count']].values
+        return self.collab_scores[cluster_indices]
+    
+    def get_popularity_scores(self, cluster_data):
+        outlook_scores = cluster_data['Job_Outlook'].map(OUTLOOK_WEIGHTS).fillna(0.5).to_numpy(dtype=float)
+        salary_scores = np.minimum(cluster_data['Salary_Midpoint'].to_numpy(dtype=float) / 25.0, 1.0)
+        return (outlook_scores * 0.6) + (salary_scores * 0.4)
+    
+    def load_training_state(self):
+        """Load the full trained model when only the serving index is in memory"""
+        if self.df is not None:
+            return True
+        manifest = self.manifest or self.read_manifest(check_dataset=False)
+        return bool(manifest) and self.load_artifacts(manifest)
+    
+    def vocabulary_drift(self, skill_term_counts, n_documents):
+        """Share of the fitted skill vocabulary that a refit on the current catalogue would replace
+        
+        Mirrors how TfidfVectorizer picks its vocabulary: terms inside the
+        document frequency bounds, ranked by corpus frequency, the top
+        max_features kept. Terms tied with the cut-off count neither way.
+        """
+        vectorizer = self.tfidf_vectorizer
+        vocabulary = vectorizer.vocabulary_
+        max_documents = vectorizer.max_df if isinstance(vectorizer.max_df, int) else vectorizer.max_df * n_documents
+        min_documents = vectorizer.min_df if isinstance(vectorizer.min_df, int) else vectorizer.min_df * n_documents
+        
+        document_counts = skill_term_counts['documents']
+        eligible = {
+            term: count for term, count in skill_term_counts['terms'].items()
+            if min_documents <= document_counts[term] <= max_documents
+        }
+        
+        if vectorizer.max_features is None or len(eligible) <= vectorizer.max_features:
+            leaving = sum(1 for term in vocabulary if term not in eligible)
+            entering = sum(1 for term in eligible if term not in vocabulary)
+        else:
+            cutoff = sorted(eligible.values(), reverse=True)[vectorizer.max_features - 1]
+            leaving = sum(1 for term in vocabulary if eligible.get(term, 0) < cutoff)
+            entering = sum(1 for term, count in eligible.items() if count > cutoff and term not in vocabulary)
+        
+        return max(leaving, entering) / max(len(vocabulary), 1)
+    
+    def update_roles(self, upserts=(), deletes=()):
+        """Insert, edit or delete catalogue roles without retraining from scratch
+        
+        upserts are role dicts with CSV or model column names; one whose
+        (cluster, role) pair exists replaces that role, the others are added.
+        deletes are (cluster, role) pairs. The fitted vectorizer, scaler and
+        label encoders are kept, so only the changed roles are vectorized and
+        only the scores they can move are recomputed: content scores of the
+        clusters they belong to, and collaborative scores of those clusters
+        plus any role that has a changed role within its neighbour radius.
+        A role bringing a new cluster, education level or outlook, or a
+        vocabulary drift above VOCABULARY_DRIFT_THRESHOLD, retrains instead.
+        
+        Rebuilds the ranking index and returns a summary of the update; saving
+        the artifacts is up to the caller.
+        """
+        import pandas as pd
+        import scipy.sparse as sp
+        from sklearn.preprocessing import normalize
+        
+        if not self.load_training_state():
+            raise RuntimeError("Career role model is not trained")
+        
+        columns = list(CSV_COLUMNS.values())
+        new_rows = pd.DataFrame(
+            [{CSV_COLUMNS.get(column, column): value for column, value in role.items()} for role in upserts],
+            columns=columns
         )
-        n_neighbors = min(10, len(cluster_indices))
+        if new_rows[ROLE_KEY].isna().any(axis=None):
+            raise ValueError("Every updated role needs a Career_Cluster and a Career_Role")
+        
+        new_keys = list(new_rows[ROLE_KEY].itertuples(index=False, name=None))
+        delete_keys = [tuple(key) for key in deletes]
+        positions = {key: position for position, key in enumerate(self.df[ROLE_KEY].itertuples(index=False, name=None))}
+        if len(set(new_keys)) != len(new_keys) or len(set(delete_keys)) != len(delete_keys):
+            raise ValueError("A career role can only appear once per update")
+        if set(new_keys) & set(delete_keys):
+            raise ValueError("A career role cannot be both updated and deleted")
+        for key in delete_keys:
+            if key not in positions:
+                raise ValueError(f"Unknown career role: {key[1]} ({key[0]})")
+        
+        n_roles = len(self.df)
+        replaced = [positions[key] for key in new_keys if key in positions]
+        old_positions = np.array(replaced + [positions[key] for key in delete_keys], dtype=np.int64)
+        kept = np.setdiff1d(np.arange(n_roles), old_positions)
+        if len(kept) + len(new_rows) == 0:
+            raise ValueError("An update cannot delete every career role")
+        
+        # Kept roles stay where they were, edited roles take their old place
+        # and new roles go last
+        order = np.argsort(np.concatenate([
+            kept, [positions.get(key, n_roles + i) for i, key in enumerate(new_keys)]
+        ]), kind='stable')
+        final_positions = np.empty(len(order), dtype=np.int64)
+        final_positions[order] = np.arange(len(order))
+        new_positions = final_positions[len(kept):]
+        
+        skill_term_counts = {name: counts.copy() for name, counts in self.skill_term_counts.items()}
+        removed_counts = self.count_skill_terms(self.df['Skills_Text'].iloc[old_positions])
+        added_counts = self.count_skill_terms(new_rows['Required_Skills'].fillna(''))
+        for name, counts in skill_term_counts.items():
+            counts -= removed_counts[name]
+            counts += added_counts[name]
+        drift = self.vocabulary_drift(skill_term_counts, len(order))
+        
+        summary = {
+            'inserted': len(new_keys) - len(replaced),
+            'updated': len(replaced),
+            'deleted': len(delete_keys),
+            'vocabulary_drift': round(drift, 4)
+        }
+        
+        try:
+            new_rows = self.prepare_role_features(new_rows)
+            unseen_labels = None
+        except ValueError as e:
+            unseen_labels = e
+        
+        if unseen_labels is not None or drift > VOCABULARY_DRIFT_THRESHOLD:
+            reason = 'new labels' if unseen_labels is not None else f'vocabulary drift {drift:.1%}'
+            print(f"Catalogue update needs a full retrain ({reason})", file=sys.stderr)
+            frames = [self.df[columns].iloc[kept]] + ([new_rows[columns]] if len(new_rows) else [])
+            self.df = pd.concat(frames).iloc[order].reset_index(drop=True)
+            self.train_model()
+            if not self.model_loaded:
+                raise RuntimeError("Career role model retraining failed")
+            self.build_ranking_index()
+            return {'mode': 'retrain', **summary, 'recomputed_roles': len(self.df)}
+        
+        affected_clusters = set(self.df['Career_Cluster'].iloc[old_positions]) | set(new_rows['Career_Cluster'])
+        old_points = self.df[COLLAB_FEATURES].values[old_positions]
+        old_points = self.scaler.transform(old_points) if len(old_points) else old_points.astype(float)
+        
+        def reorder(kept_values, new_values):
+            return np.concatenate([np.asarray(kept_values)[kept], new_values])[order]
+        
+        frames = [self.df.iloc[kept]] + ([new_rows[self.df.columns]] if len(new_rows) else [])
+        if len(new_rows):
+            new_matrix = normalize(self.tfidf_vectorizer.transform(new_rows['Skills_Text']))
+        else:
+            new_matrix = sp.csr_matrix((0, self.skills_tfidf_matrix.shape[1]))
+        self.skills_tfidf_matrix = sp.vstack([self.skills_tfidf_matrix[kept], new_matrix], format='csr')[order]
+        self.content_scores = reorder(self.content_scores, np.zeros(len(new_rows)))
+        self.collab_scores = reorder(self.collab_scores, np.zeros(len(new_rows)))
+        self.collab_radii = reorder(self.collab_radii, np.zeros(len(new_rows)))
+        self.df = pd.concat(frames).iloc[order].reset_index(drop=True)
+        self.skill_term_counts = skill_term_counts
         
-        distances, _ = self.knn_model.kneighbors(cluster_features, n_neighbors=n_neighbors)
+        self.content_scores = self.compute_content_scores(clusters=affected_clusters)
         
-        collab_scores = []
-        for dist_array in distances:
-            similarity = 1 / (1 + dist_array.mean())
-            collab_scores.append(similarity)
+        collab_features_scaled = self.scaler.transform(self.df[COLLAB_FEATURES].values)
+        self.knn_model.set_params(n_neighbors=min(15, len(self.df)))
+        self.knn_model.fit(collab_features_scaled)
         
-        return np.array(collab_scores)
+        # A role's neighbours can only change if a removed or added role lies
+        # within the distance of its farthest neighbour
+        changed_points = np.vstack([old_points, collab_features_scaled[new_positions]])
+        affected = self.df['Career_Cluster'].isin(affected_clusters).to_numpy(copy=True)
+        for point in changed_points:
+            affected |= np.linalg.norm(collab_features_scaled - point, axis=1) <= self.collab_radii + 1e-9
+        affected_positions = np.flatnonzero(affected)
+        self.collab_scores, self.collab_radii = self.compute_collaborative_scores(collab_features_scaled, affected_positions)
+        
+        self.build_ranking_index()
+        return {'mode': 'incremental', **summary, 'recomputed_roles': len(affected_positions)}
     
-    def get_popularity_scores(self, cluster_data):
-        popularity_scores = []
-        outlook_weights = {'Low': 0.2, 'Medium': 0.5, 'High': 0.8, 'Very High': 1.0}
+    def sync_with_dataset(self):
+        """Apply the roles added, edited or removed in the CSV as a catalogue update
+        
+        Returns the update summary, or None when the CSV cannot be used that
+        way (unreadable, or with duplicate roles) and the model should retrain.
+        """
+        import pandas as pd
+        
+        columns = list(CSV_COLUMNS.values())
+        try:
+            dataset_fingerprint = file_sha256(DATASET_PATH)
+            catalogue = pd.read_csv(DATASET_PATH).rename(columns=CSV_COLUMNS)[columns]
+        except Exception as e:
+            print(f"ERROR loading CSV: {e}", file=sys.stderr)
+            return None
+        
+        key_columns = [columns.index(column) for column in ROLE_KEY]
+        
+        def catalogue_rows(frame):
+            values = frame[columns].astype(object).where(frame[columns].notna(), None)
+            return {tuple(row[i] for i in key_columns): row for row in values.itertuples(index=False, name=None)}
+        
+        current, target = catalogue_rows(self.df), catalogue_rows(catalogue)
+        if len(target) != len(catalogue):
+            print("Career role CSV lists a role twice, retraining", file=sys.stderr)
+            return None
+        
+        upserts = [dict(zip(columns, row)) for key, row in target.items() if current.get(key) != row]
+        deletes = [key for key in current if key not in target]
+        try:
+            summary = self.update_roles(upserts, deletes)
+        except Exception as e:
+            print(f"Error updating the catalogue: {e}", file=sys.stderr)
+            return None
+        
+        self.dataset_fingerprint = dataset_fingerprint
+        print(f"Catalogue updated from CSV: {summary}", file=sys.stderr)
+        return summary
+    
+    def save_catalogue(self):
+        """Write the current catalogue back to the CSV the model is built from"""
+        columns = {column: csv_column for csv_column, column in CSV_COLUMNS.items()}
+        payload = self.df[list(columns)].rename(columns=columns).to_csv(index=False).encode('utf-8')
+        write_atomic(DATASET_PATH, payload)
+        self.dataset_fingerprint = hashlib.sha256(payload).hexdigest()
+    
+    def build_ranking_index(self):
+        """Precompute each cluster's normalized score vectors and response records
         
-        for _, row in cluster_data.iterrows():
-            outlook_score = outlook_weights.get(row['Job_Outlook'], 0.5)
-            salary_score = min(row['Salary_Midpoint'] / 25.0, 1.0)
-            popularity = (outlook_score * 0.6) + (salary_score * 0.4)
-            popularity_scores.append(popularity)
+        Content, collaborative and popularity scores only depend on the
+        catalogue, so a query just adds the education bonus, takes the top n
+        and fills in the prebuilt records. Roles are laid out cluster by
+        cluster so each cluster is one contiguous slice of the arrays.
+        """
+        self.cluster_positions = self.df.groupby('Career_Cluster', sort=False).indices
+        popularity_scores = self.get_popularity_scores(self.df)
+        # Built from column lists: much cheaper than DataFrame.to_dict on large catalogues
+        records = list(zip(*(self.df[column].tolist() for column in RECORD_COLUMNS.values())))
+        educations = self.df['Education_Level_Required'].tolist()
         
-        return np.array(popularity_scores)
+        education_codes = {}
+        index_records, clusters, score_columns, education_column = [], {}, [], []
+        for career_cluster, cluster_positions in self.cluster_positions.items():
+            cluster_indices = self.df.index[cluster_positions].tolist()
+            
+            content_norm = normalize_scores(self.get_content_scores(cluster_indices))
+            collab_norm = normalize_scores(self.get_collaborative_scores(cluster_indices))
+            popularity_norm = normalize_scores(popularity_scores[cluster_positions])
+            
+            clusters[career_cluster] = [len(index_records), len(index_records) + len(cluster_positions)]
+            index_records.extend(records[position] for position in cluster_positions)
+            score_columns.append(np.vstack([0.4 * content_norm + 0.3 * collab_norm + 0.3 * popularity_norm] + [
+                [round(float(score), 3) for score in component]
+                for component in (content_norm, collab_norm, popularity_norm)
+            ]))
+            education_column.extend(
+                education_codes.setdefault(educations[position], len(education_codes))
+                if isinstance(educations[position], str) else UNKNOWN_EDUCATION_CODE
+                for position in cluster_positions
+            )
+        
+        self.serving_index = {
+            'clusters': clusters,
+            'education_codes': education_codes,
+            'skill_analyzer': self.skill_analyzer_settings()
+        }
+        self.serving_scores = np.hstack(score_columns) if score_columns else np.zeros((1 + len(COMPONENT_SCORES), 0))
+        self.serving_education = np.asarray(education_column, dtype=np.int32)
+        self.encode_role_payloads(index_records)
+        
+        serving_order = [position for positions in self.cluster_positions.values() for position in positions]
+        self.build_skill_index(serving_order)
+        self.index_rankings()
+    
+    def skill_analyzer_settings(self):
+        """What a query needs to be vectorized like the fitted TfidfVectorizer, as plain JSON"""
+        vectorizer = self.tfidf_vectorizer
+        vocabulary = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        return {
+            'terms': vocabulary,
+            'idf': vectorizer.idf_.tolist(),
+            'token_pattern': vectorizer.token_pattern,
+            'ngram_range': list(vectorizer.ngram_range),
+            'lowercase': vectorizer.lowercase,
+            'stop_words': sorted(vectorizer.get_stop_words() or [])
+        }
+    
+    def build_skill_index(self, serving_order):
+        """Invert the role x term TF-IDF matrix into per-term posting lists
+        
+        Postings hold serving positions sorted ascending, so the roles of one
+        cluster (a contiguous slice) are found in each list by binary search.
+        """
+        postings = self.skills_tfidf_matrix[serving_order].tocsc()
+        postings.sort_indices()
+        self.skill_offsets = postings.indptr.astype(np.int64)
+        self.skill_roles = postings.indices.astype(np.int32)
+        self.skill_weights = postings.data.astype(np.float64)
+    
+    def encode_role_payloads(self, records):
+        """Pre-encode the record of every role, in serving order, as JSON bytes
+        
+        Each field is stored as its own `, "name": value` fragment and
+        role_payload_offsets[role] holds where each of the role's fields
+        starts, then where the role ends. A response is spliced together from
+        the fragments it needs, without converting or encoding any value.
+        """
+        keys = [f', {json.dumps(field)}: ' for field in RECORD_COLUMNS]
+        fragments = [(key + json.dumps(value)).encode('utf-8') for values in records for key, value in zip(keys, values)]
+        
+        ends = np.cumsum([len(fragment) for fragment in fragments], dtype=np.int64)
+        offsets = np.concatenate([[0], ends]).astype(np.int64)
+        role_starts = np.arange(len(records))[:, np.newaxis] * len(keys)
+        self.role_payloads = np.frombuffer(b''.join(fragments), dtype=np.uint8)
+        self.role_payload_offsets = offsets[role_starts + np.arange(len(keys) + 1)]
+    
+    def role_payload(self, offsets, runs=None):
+        """Pre-encoded `, "name": value, ...` fields of one role (offsets: its row of role_payload_offsets)
+        
+        runs are the (first, end) slot ranges to keep, from projection_runs;
+        None keeps every field.
+        """
+        if runs is None:
+            return self.role_payload_view[offsets[0]:offsets[-1]]
+        return b''.join([self.role_payload_view[offsets[first]:offsets[end]] for first, end in runs])
+    
+    def role_record(self, position, runs=None):
+        """Record dict of one role, decoded from its payload on first use"""
+        record = self.role_records.get(position)
+        if record is None:
+            payload = self.role_payload(self.role_offsets[position].tolist())
+            record = self.role_records[position] = json.loads(b'{' + bytes(payload)[2:] + b'}')
+        if runs is None:
+            return record
+        return {field: record[field] for first, end in runs for field in RECORD_FIELDS[first:end]}
     
-    def predict_career_roles(self, career_cluster, user_education=None, top_n=4):
+    def build_response(self, response, ranked, runs=None, encoded=False):
+        """Fill in response['recommendations'] from (serving position, scores) pairs
+        
+        encoded=True returns the response as JSON bytes (what json.dumps
+        would give) with the role fields spliced in from their payloads.
+        """
+        response['total_recommendations'] = len(ranked)
+        if not encoded:
+            response['recommendations'] = [
+                {'rank': rank, **self.role_record(position, runs), **scores}
+                for rank, (position, scores) in enumerate(ranked, 1)
+            ]
+            return response
+        
+        role_offsets = self.role_offsets[[position for position, _ in ranked]].tolist()
+        recommendations = b', '.join([
+            b''.join([b'{"rank": %d' % rank, self.role_payload(offsets, runs), encode_scores(scores), b'}'])
+            for rank, (offsets, (_, scores)) in enumerate(zip(role_offsets, ranked), 1)
+        ])
+        # Quotes inside string values are escaped, so the placeholder can only match the key itself
+        head, tail = json.dumps(response).encode('utf-8').split(b'"recommendations": null', 1)
+        return b''.join([head, b'"recommendations": [', recommendations, b']', tail])
+    
+    def index_rankings(self):
+        """Point each cluster's ranking at its slice of the serving arrays"""
+        # Plain ndarray views: indexing a np.memmap costs more than the lookup itself
+        self.role_payload_view = memoryview(self.role_payloads)
+        self.role_offsets = np.asarray(self.role_payload_offsets)
+        self.role_records = {}
+        self.education_codes = self.serving_index['education_codes']
+        
+        analyzer = self.serving_index['skill_analyzer']
+        self.skill_terms = analyzer['terms']
+        self.skill_term_ids = {term: term_id for term_id, term in enumerate(self.skill_terms)}
+        self.skill_idf = analyzer['idf']
+        self.skill_token_pattern = re.compile(analyzer['token_pattern'])
+        self.skill_ngram_range = analyzer['ngram_range']
+        self.skill_lowercase = analyzer['lowercase']
+        self.skill_stop_words = frozenset(analyzer['stop_words'])
+        
+        self.cluster_rankings = {
+            career_cluster: {
+                'start': start,
+                'component_scores': self.serving_scores[BASE_SCORE_ROW + 1:, start:end],
+                'education': self.serving_education[start:end],
+                'base_scores': self.serving_scores[BASE_SCORE_ROW, start:end]
+            }
+            for career_cluster, (start, end) in self.serving_index['clusters'].items()
+        }
+    
+    def education_code(self, user_education):
+        """Code of an education level; -1 (matching no role) when absent or unknown"""
+        if not user_education:
+            return -1
+        return self.education_codes.get(user_education, -1)
+    
+    def predict_career_roles(self, career_cluster, user_education=None, top_n=4, fields=None, encoded=False):
+        """Top roles of a cluster; fields limits each role to those record fields
+        
+        encoded=True returns the response as JSON bytes instead of a dict.
+        """
         if not self.model_loaded:
             return {"success": False, "error": "Model not loaded"}
         
         try:
-            cluster_data = self.df[self.df['Career_Cluster'] == career_cluster].copy()
+            ranking = self.cluster_rankings.get(career_cluster)
             
-            if cluster_data.empty:
+            if ranking is None:
                 return {
                     "success": False,
                     "error": f"No roles found for cluster: {career_cluster}"
                 }
             
-            cluster_indices = cluster_data.index.tolist()
+            runs = projection_runs(fields)
+            with metrics.stage('predict'):
+                hybrid_scores = ranking['base_scores']
+                if user_education:
+                    hybrid_scores = hybrid_scores + (ranking['education'] == self.education_code(user_education)) * 0.15
             
-            content_scores = self.get_content_scores(cluster_indices)
-            collab_scores = self.get_collaborative_scores(cluster_indices)
-            popularity_scores = self.get_popularity_scores(cluster_data)
+            return self.format_recommendations(ranking, hybrid_scores, career_cluster, user_education, top_n, runs, encoded)
             
-            def normalize_scores(scores):
-                if len(scores) == 0 or scores.std() == 0:
-                    return scores
-                return (scores - scores.min()) / (scores.max() - scores.min())
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def format_recommendations(self, ranking, hybrid_scores, career_cluster, user_education, top_n, runs=None, encoded=False):
+        """Build the response for the top_n roles of one cluster"""
+        with metrics.stage('predict'):
+            top_indices = top_n_indices(hybrid_scores, top_n)
+        
+        with metrics.stage('format'):
+            # One gather per array rather than one memmap lookup per role
+            confidence_scores = np.asarray(hybrid_scores)[top_indices].tolist()
+            component_scores = ranking['component_scores'][:, top_indices].T.tolist()
+            ranked = [
+                (ranking['start'] + int(idx), {
+                    'confidence_score': round(confidence, 3),
+                    **dict(zip(COMPONENT_SCORES, components))
+                })
+                for idx, confidence, components in zip(top_indices, confidence_scores, component_scores)
+            ]
             
-            content_norm = normalize_scores(content_scores)
-            collab_norm = normalize_scores(collab_scores)
-            popularity_norm = normalize_scores(popularity_scores)
+            return self.build_response({
+                "success": True,
+                "career_cluster": career_cluster,
+                "total_recommendations": None,
+                "user_education": user_education,
+                "recommendations": None,
+                "algorithm": "Hybrid KNN + Cosine Similarity",
+                "model_version": "3.0"
+            }, ranked, runs, encoded)
+    
+    def predict_batch(self, queries):
+        """Recommend roles for many queries at once
+        
+        Each query is a request dict as taken by predict_from_input. Queries
+        are grouped by cluster and scored together as one (queries x roles)
+        matrix against the cluster's precomputed vectors. Returns one result
+        per query, in input order.
+        """
+        if not self.model_loaded:
+            return [{"success": False, "error": "Model not loaded"} for _ in queries]
+        
+        results = [None] * len(queries)
+        by_cluster = {}
+        for position, query in enumerate(queries):
+            try:
+                career_cluster, user_education, top_n, fields = parse_role_query(query)
+                runs = projection_runs(fields)
+            except Exception as e:
+                results[position] = {"success": False, "error": str(e)}
+                continue
+            by_cluster.setdefault(career_cluster, []).append((position, user_education, top_n, runs))
+        
+        for career_cluster, group in by_cluster.items():
+            ranking = self.cluster_rankings.get(career_cluster)
             
-            hybrid_scores = (0.4 * content_norm + 0.3 * collab_norm + 0.3 * popularity_norm)
+            if ranking is None:
+                for position, *_ in group:
+                    results[position] = {
+                        "success": False,
+                        "error": f"No roles found for cluster: {career_cluster}"
+                    }
+                continue
             
-            if user_education:
-                education_match = cluster_data['Education_Level_Required'] == user_education
-                hybrid_scores += education_match.values * 0.15
+            # Queries without an education match nothing and keep the base scores
+            with metrics.stage('predict'):
+                education_codes = np.array([self.education_code(user_education) for _, user_education, *_ in group])
+                hybrid_scores = ranking['base_scores'] + (education_codes[:, None] == ranking['education']) * 0.15
             
-            top_indices = np.argsort(-hybrid_scores)[:top_n]
+            for (position, user_education, top_n, runs), query_scores in zip(group, hybrid_scores):
+                try:
+                    results[position] = self.format_recommendations(ranking, query_scores, career_cluster, user_education, top_n, runs)
+                except Exception as e:
+                    results[position] = {"success": False, "error": str(e)}
+        
+        return results
+    
+    def skill_query_vector(self, query_text):
+        """Unit-length TF-IDF weights {term_id: weight} of a free-text query
+        
+        Tokenizes exactly like the fitted vectorizer (token pattern, stop
+        words removed before n-grams are formed), without scikit-learn.
+        """
+        if self.skill_lowercase:
+            query_text = query_text.lower()
+        tokens = [token for token in self.skill_token_pattern.findall(query_text) if token not in self.skill_stop_words]
+        
+        counts = {}
+        min_n, max_n = self.skill_ngram_range
+        for n in range(min_n, max_n + 1):
+            for i in range(len(tokens) - n + 1):
+                term_id = self.skill_term_ids.get(' '.join(tokens[i:i + n]))
+                if term_id is not None:
+                    counts[term_id] = counts.get(term_id, 0) + 1
+        
+        weights = {term_id: count * self.skill_idf[term_id] for term_id, count in counts.items()}
+        norm = sum(weight * weight for weight in weights.values()) ** 0.5
+        return {term_id: weight / norm for term_id, weight in weights.items()} if norm else {}
+    
+    def search_roles(self, query_text, career_cluster=None, top_n=DEFAULT_SEARCH_TOP_N, fields=None, encoded=False):
+        """Roles whose required skills best match free text (skills, interests)
+        
+        Scores are the cosine similarity of TF-IDF vectors, accumulated only
+        over the posting lists of the query's terms, so the cost depends on
+        how many roles share those terms rather than on the catalogue size.
+        career_cluster (CSV name) limits the search to that cluster; fields
+        and encoded work as in predict_career_roles.
+        """
+        if not self.model_loaded:
+            return {"success": False, "error": "Model not loaded"}
+        
+        try:
+            record_runs = projection_runs(fields)
+            if career_cluster:
+                if career_cluster not in self.serving_index['clusters']:
+                    return {"success": False, "error": f"No roles found for cluster: {career_cluster}"}
+                start, end = self.serving_index['clusters'][career_cluster]
+            else:
+                start, end = 0, len(self.role_payload_offsets)
             
-            recommendations = []
-            for i, idx in enumerate(top_indices):
-                row = cluster_data.iloc[idx]
+            with metrics.stage('predict'):
+                query = self.skill_query_vector(query_text or '')
+                term_postings = []
+                for term_id, query_weight in query.items():
+                    lower, upper = self.skill_offsets[term_id], self.skill_offsets[term_id + 1]
+                    roles = self.skill_roles[lower:upper]
+                    first, last = np.searchsorted(roles, [start, end])
+                    term_postings.append((term_id, roles[first:last], self.skill_weights[lower + first:lower + last] * query_weight))
                 
-                recommendation = {
-                    'rank': i + 1,
-                    'career_role': row['Career_Role'],
-                    'career_cluster': career_cluster,
-                    'required_skills': row['Required_Skills'],
-                    'education_level_required': row['Education_Level_Required'],
-                    'avg_salary_range': row['Avg_Salary_Range'],
-                    'job_outlook': row['Job_Outlook'],
-                    'growth_path': row['Growth_Path'],
-                    'learning_resources': row['Learning_Resources'],
-                    'entrance_exams': row['Entrance_Exams'],
-                    'field_for_admission': row['Field_for_Admission'],
-                    'online_resources_links': row['Online_Resources_Links'],
-                    'free_certifications': row['Free_Certifications'],
-                    'confidence_score': round(float(hybrid_scores[idx]), 3),
-                    'content_score': round(float(content_norm[idx]), 3) if len(content_norm) > idx else 0,
-                    'collaborative_score': round(float(collab_norm[idx]), 3) if len(collab_norm) > idx else 0,
-                    'popularity_score': round(float(popularity_norm[idx]), 3)
-                }
-                recommendations.append(recommendation)
+                roles = np.concatenate([roles for _, roles, _ in term_postings] or [np.array([], dtype=np.int32)])
+                weights = np.concatenate([weights for _, _, weights in term_postings] or [np.array([])])
+                
+                # Few postings: sort just those; many (common terms, wide range):
+                # one dense pass over the range is cheaper than sorting them
+                if len(roles) * 4 < end - start:
+                    candidates, slots = np.unique(roles, return_inverse=True)
+                    scores = np.bincount(slots, weights=weights, minlength=len(candidates))
+                else:
+                    dense_scores = np.bincount(roles - start, weights=weights, minlength=end - start)
+                    candidates = np.flatnonzero(dense_scores)
+                    scores = dense_scores[candidates]
+                    candidates += start
+                top_indices = top_n_indices(scores, top_n)
             
-            return {
-                "success": True,
-                "career_cluster": career_cluster,
-                "total_recommendations": len(recommendations),
-                "user_education": user_education,
-                "recommendations": recommendations,
-                "algorithm": "Hybrid KNN + Cosine Similarity",
-                "model_version": "3.0"
-            }
+            with metrics.stage('format'):
+                ranked = []
+                for idx in top_indices:
+                    role = int(candidates[idx])
+                    ranked.append((role, {
+                        'match_score': round(float(scores[idx]), 3),
+                        'matched_skills': [
+                            self.skill_terms[term_id] for term_id, roles, _ in term_postings
+                            if sorted_contains(roles, role)
+                        ]
+                    }))
+                
+                return self.build_response({
+                    "success": True,
+                    "query": query_text,
+                    "career_cluster": career_cluster,
+                    "total_recommendations": None,
+                    "recommendations": None,
+                    "algorithm": "TF-IDF Skill Index",
+                    "model_version": "3.0"
+                }, ranked, record_runs, encoded)
             
         except Exception as e:
             return {"success": False, "error": str(e)}
-        
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python model3_career_role_predictor.py <input_json>")
-        return
     
+    def search_from_input(self, input_data, encoded=False):
+        """Run a skills search from a raw request dict"""
+        return self.search_roles(*parse_skill_query(input_data), encoded=encoded)
+    
+    def predict_from_input(self, input_data, encoded=False):
+        """Run a prediction from a raw request dict (as sent by the Node server)"""
+        return self.predict_career_roles(*parse_role_query(input_data), encoded=encoded)
+
+def parse_role_query(input_data):
+    """Read (CSV cluster, user_education, top_n, fields) from a raw request dict"""
+    # Get cluster name from input and map it for CSV compatibility
+    career_cluster = input_data.get('careerCluster') or input_data.get('career_cluster', 'IT')
+    mapped_cluster = map_career_cluster(career_cluster)
+    
+    # Get other parameters
+    user_education = input_data.get('user_education', None)
+    top_n = input_data.get('top_n', 4)
+    
+    return mapped_cluster, user_education, top_n, input_data.get('fields')
+
+def parse_skill_query(input_data):
+    """Read (query text, CSV cluster or None, top_n, fields) from a skills search request
+    
+    The text comes from 'query', 'skills' or 'interests'; lists are joined.
+    """
+    query_text = input_data.get('query') or input_data.get('skills') or input_data.get('interests') or ''
+    if isinstance(query_text, (list, tuple)):
+        query_text = ', '.join(str(item) for item in query_text)
+    
+    career_cluster = input_data.get('careerCluster') or input_data.get('career_cluster')
+    top_n = input_data.get('top_n', DEFAULT_SEARCH_TOP_N)
+    
+    return str(query_text), map_career_cluster(career_cluster) if career_cluster else None, top_n, input_data.get('fields')
+
+def projection_runs(fields):
+    """Payload slot ranges [(first, end)] for a "fields" request value (a list or comma-separated names)
+    
+    None keeps every record field. The role and its cluster are always
+    included, and so are the scores; naming a score is accepted and changes
+    nothing. Adjacent fields share a range so they are copied in one slice.
+    """
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    
+    for field in fields:
+        if field not in FIELD_SLOTS and field not in SCORE_FIELDS:
+            raise ValueError(f"Unknown field: {field}")
+    runs = []
+    for slot in sorted({FIELD_SLOTS[field] for field in (*ROLE_ID_FIELDS, *fields) if field in FIELD_SLOTS}):
+        if runs and runs[-1][1] == slot:
+            runs[-1][1] = slot + 1
+        else:
+            runs.append([slot, slot + 1])
+    return runs
+
+def npy_bytes(array):
+    """Serialize an array in .npy format, ready to be memory-mapped"""
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(array))
+    return buffer.getvalue()
+
+def salary_midpoint(salary_str):
+    """Midpoint of an 'a-b LPA' salary range in LPA; 10 when it cannot be read"""
     try:
-        input_data = json.loads(sys.argv[1])
-        predictor = CareerRolePredictor()
-        
-        # Get cluster name from input
-        career_cluster = input_data.get('careerCluster') or input_data.get('career_cluster', 'IT')
-        
-        # ✅ ADD CLUSTER MAPPING HERE
-        cluster_mapping = {
-            'Engineering': 'STEM',
-            'Legal': 'Law',
-            'Law': 'Legal'
-        }
+        if not isinstance(salary_str, str):
+            return 10
+        numbers = salary_str.split(' ')[0].split('-')
+        if len(numbers) == 2:
+            return (float(numbers[0]) + float(numbers[1])) / 2
+        return 10
+    except ValueError:
+        return 10
+
+def encode_scores(scores):
+    """`, "name": value` JSON of a recommendation's scores
+    
+    Scores are finite floats, which json.dumps writes as their repr.
+    """
+    return b''.join([
+        SCORE_KEYS[field] + (repr(value) if isinstance(value, float) else json.dumps(value)).encode('utf-8')
+        for field, value in scores.items()
+    ])
+
+def sorted_contains(sorted_array, value):
+    """Membership test on an ascending array by binary search"""
+    position = np.searchsorted(sorted_array, value)
+    return position < len(sorted_array) and sorted_array[position] == value
+
+def normalize_scores(scores):
+    """Min-max scale scores to [0, 1], leaving constant vectors unchanged"""
+    if len(scores) == 0 or scores.std() == 0:
+        return scores
+    return (scores - scores.min()) / (scores.max() - scores.min())
+
+def top_n_indices(scores, top_n):
+    """Indices of the top_n highest scores, best first"""
+    if 0 < top_n < len(scores):
+        candidates = np.sort(np.argpartition(-scores, top_n - 1)[:top_n])
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
+    return np.argsort(-scores, kind='stable')[:top_n]
+
+def map_career_cluster(career_cluster):
+    """Map Model 2 cluster names onto the cluster names used in the CSV"""
+    return CLUSTER_MAPPING.get(career_cluster, career_cluster)
         
-        # Map cluster name for CSV compatibility
-        mapped_cluster = cluster_mapping.get(career_cluster, career_cluster)
+def build_artifacts(neighbor_backend=DEFAULT_NEIGHBOR_BACKEND):
+    """Retrain Model 3 from the CSV and write a fresh artifact bundle"""
+    predictor = CareerRolePredictor(rebuild=True, neighbor_backend=neighbor_backend)
+    
+    if predictor.manifest is None:
+        return {"success": False, "error": "Failed to build artifact bundle"}
+    return {"success": True, "artifacts_dir": predictor.artifacts_dir, "manifest": predictor.manifest}
+
+def update_catalogue(updates):
+    """Apply {"upsert": [roles], "delete": [[cluster, role]]} to the catalogue, its CSV and the artifacts"""
+    predictor = CareerRolePredictor()
+    if not predictor.model_loaded:
+        return {"success": False, "error": "Career role model is not available"}
+    
+    summary = predictor.update_roles(updates.get('upsert', []), updates.get('delete', []))
+    predictor.save_catalogue()
+    if predictor.save_artifacts() is None:
+        return {"success": False, "error": "Failed to save artifact bundle"}
+    return {"success": True, **summary, "career_roles": len(predictor.df)}
+
+def print_json(result):
+    """Print a result dict, or an already encoded JSON response, as one line on stdout"""
+    if not isinstance(result, bytes):
+        print(json.dumps(result))
+        return
+    sys.stdout.flush()
+    sys.stdout.buffer.write(result + b'\n')
+    sys.stdout.buffer.flush()
+
+def predict_batch_main(argv):
+    """Answer a JSON-lines file of queries (stdin when no path is given)
+    
+    Writes one JSON result per line to stdout, in input order.
+    """
+    with metrics.request('model3.batch'):
+        with metrics.stage('parse'):
+            if argv:
+                with open(argv[0], encoding='utf-8') as f:
+                    lines = f.readlines()
+            else:
+                lines = sys.stdin.readlines()
+            queries = [json.loads(line) for line in lines if line.strip()]
         
-        print(f"[Model 3 Python] Received cluster: {career_cluster}", file=sys.stderr)
-        print(f"[Model 3 Python] Mapped to CSV cluster: {mapped_cluster}", file=sys.stderr)
+        # Prefer the warm model server when one is configured
+        from model_client import call_model_server
         
-        # Get other parameters
-        user_education = input_data.get('user_education', None)
-        top_n = input_data.get('top_n', 4)
+        with metrics.stage('forward'):
+            response = call_model_server('/model3/batch', {'queries': queries})
+        if response is None:
+            results = CareerRolePredictor().predict_batch(queries)
+        else:
+            results = response.get('results', [])
         
-        # ✅ Use mapped_cluster instead of career_cluster
-        result = predictor.predict_career_roles(mapped_cluster, user_education, top_n)
+        with metrics.stage('serialize'):
+            output = '\n'.join(json.dumps(result) for result in results)
+    
+    if output:
+        print(output)
+    print(f"[Model 3 Python] Answered {len(results)} queries", file=sys.stderr)
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python model3_career_role_predictor.py <input_json>")
+        print("       python model3_career_role_predictor.py build-artifacts [exact|unique]")
+        print("       python model3_career_role_predictor.py batch [queries.jsonl]")
+        print("       python model3_career_role_predictor.py search <input_json>")
+        print("       python model3_career_role_predictor.py update-catalogue [updates.json]")
+        return
+    
+    if sys.argv[1] == 'batch':
+        predict_batch_main(sys.argv[2:])
+        return
+    
+    if sys.argv[1] == 'search':
+        try:
+            with metrics.request('model3.search'):
+                input_data = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
+                result = CareerRolePredictor().search_from_input(input_data, encoded=True)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        print_json(result)
+        return
+    
+    if sys.argv[1] == 'update-catalogue':
+        try:
+            if len(sys.argv) > 2:
+                with open(sys.argv[2], encoding='utf-8') as f:
+                    updates = json.load(f)
+            else:
+                updates = json.load(sys.stdin)
+            result = update_catalogue(updates)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
         print(json.dumps(result))
+        return
+    
+    if sys.argv[1] == 'build-artifacts':
+        neighbor_backend = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_NEIGHBOR_BACKEND
+        if neighbor_backend not in NEIGHBOR_BACKENDS:
+            print(json.dumps({"success": False, "error": f"Unknown neighbour backend: {neighbor_backend}"}))
+            return
+        print(json.dumps(build_artifacts(neighbor_backend)))
+        return
+    
+    try:
+        with metrics.request('model3'):
+            with metrics.stage('parse'):
+                input_data = json.loads(sys.argv[1])
+            
+            career_cluster = input_data.get('careerCluster') or input_data.get('career_cluster', 'IT')
+            print(f"[Model 3 Python] Received cluster: {career_cluster}", file=sys.stderr)
+            print(f"[Model 3 Python] Mapped to CSV cluster: {map_career_cluster(career_cluster)}", file=sys.stderr)
+            
+            # Prefer the warm model server when one is configured
+            from model_client import call_model_server
+            
+            with metrics.stage('forward'):
+                result = call_model_server('/model3', input_data)
+            if result is None:
+                predictor = CareerRolePredictor()
+                result = predictor.predict_from_input(input_data, encoded=True)
+            
+            with metrics.stage('serialize'):
+                output = result if isinstance(result, bytes) else json.dumps(result).encode('utf-8')
+        print_json(output)
         
     except Exception as e:
         error_result = {"success": False, "error": str(e)}
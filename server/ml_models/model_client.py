@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Model Server Client
+Lightweight helper used by the model CLIs to forward a request to the
+long-running model server instead of loading the models themselves
+"""
+
+import json
+import os
+import urllib.error
+import urllib.request
+
+# Set ML_MODEL_SERVER_URL (e.g. http://127.0.0.1:5005) to enable the server
+SERVER_URL_ENV = 'ML_MODEL_SERVER_URL'
+DEFAULT_TIMEOUT = 30
+
+
+def get_server_url():
+    """Return the configured model server URL, or None when it is disabled"""
+    url = os.environ.get(SERVER_URL_ENV, '').strip()
+    return url.rstrip('/') or None
+
+
+def call_model_server(endpoint, payload, timeout=DEFAULT_TIMEOUT):
+    """POST a JSON payload to the model server
+
+    Returns the decoded JSON result, or None when no server is configured or
+    the server could not answer so the caller can fall back to local models.
+    """
+    server_url = get_server_url()
+    if server_url is None:
+        return None
+
+    request = urllib.request.Request(
+        server_url + endpoint,
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
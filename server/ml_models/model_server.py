@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Model Server
+Long-running process that loads Model 1, Model 2 and Model 3 once and
+answers JSON requests over local HTTP
+
+Endpoints:
+    GET  /health  -> model load status
+    GET  /metrics -> request counters and stage latency histograms (needs ML_MODEL_METRICS)
+    POST /model1  -> Model1ScoringEngine (same payload as the stdin CLI)
+    POST /model2  -> CareerPredictor.predict_career (same payload as argv CLI);
+                     concurrent requests are micro-batched into predict_batch
+    POST /model2/batch -> CareerPredictor.predict_batch ({"users": [...]})
+    POST /model3  -> CareerRolePredictor (same payload as argv CLI)
+    POST /model3/batch -> CareerRolePredictor.predict_batch ({"queries": [...]})
+    POST /model3/search -> CareerRolePredictor.search_roles ({"query": "skills or interests", "careerCluster"?: ...})
+    Model 3 requests take "fields": ["growth_path", ...] to trim each role
+    down to those fields (plus the role, its cluster and the scores)
+    POST /pipeline -> AssessmentPipeline: Model 1 -> Model 2 -> Model 3 in one call
+
+With --workers N the models are loaded once and N pre-forked worker
+processes answer the POST routes from a bounded queue (see worker_pool.py).
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ML_MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
+for model_dir in ('model1', 'model2', 'model3'):
+    sys.path.insert(0, os.path.join(ML_MODELS_DIR, model_dir))
+
+from model1_scoring_engine import score_assessment
+from model2_cluster_predictor import CareerPredictor
+from model3_career_role_predictor import CareerRolePredictor
+from pipeline import AssessmentPipeline
+from instrumentation import metrics, merge_snapshots
+from micro_batching import MicroBatcher, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS
+from worker_pool import WorkerPool, DEFAULT_MAX_QUEUE, DEFAULT_JOB_TIMEOUT
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 5005
+# Pending connections the socket accepts; a class submitting at once overflows the default 5
+LISTEN_BACKLOG = 128
+
+
+class ModelService:
+    def __init__(self, batch_window_ms=DEFAULT_MAX_WAIT_MS, max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+        """Load every model once for the lifetime of the process
+        
+        Model 2 requests arriving within batch_window_ms of each other are
+        answered by one predict_batch call of up to max_batch_size users;
+        a window of 0 predicts every request on its own.
+        """
+        self.career_predictor = CareerPredictor(model_path=os.path.join(ML_MODELS_DIR, 'model2'))
+        self.role_predictor = CareerRolePredictor()
+        self.pipeline = AssessmentPipeline(self.career_predictor, self.role_predictor)
+        
+        self.cluster_batcher = None
+        if batch_window_ms > 0 and max_batch_size > 1:
+            self.cluster_batcher = MicroBatcher(
+                self.predict_cluster_group, max_batch_size, batch_window_ms, name='model2.micro_batch'
+            ).start()
+
+        self.routes = {
+            '/model1': self.score_responses,
+            '/model2': self.predict_cluster,
+            '/model2/batch': self.predict_cluster_batch,
+            '/model3': self.recommend_roles,
+            '/model3/batch': self.recommend_roles_batch,
+            '/model3/search': self.search_roles,
+            '/pipeline': self.run_pipeline
+        }
+
+    def after_fork(self):
+        """Fresh locks in a forked worker; a parent thread may have held them at fork time"""
+        metrics.lock = threading.Lock()
+        # The parent still reports everything recorded before the fork
+        metrics.counters = {}
+        metrics.histograms = {}
+        if self.career_predictor.model_loaded:
+            self.career_predictor.prediction_cache.lock = threading.Lock()
+
+    def close(self):
+        if self.cluster_batcher is not None:
+            self.cluster_batcher.close()
+        if self.career_predictor.model_loaded:
+            self.career_predictor.prediction_cache.save()
+
+    def cache_stats(self):
+        return self.career_predictor.prediction_cache.stats() if self.career_predictor.model_loaded else None
+
+    def worker_stats(self):
+        """What a pool worker reports for /health and /metrics"""
+        return {"model2_cache": self.cache_stats(), "metrics": metrics.snapshot()}
+
+    def health(self, worker_stats=None):
+        """worker_stats: collected from the pool workers, whose caches are the live ones"""
+        if worker_stats is None:
+            cache_stats = self.cache_stats()
+        else:
+            cache_stats = combine_cache_stats([stats["model2_cache"] for stats in worker_stats])
+        return {
+            "success": True,
+            "models": {
+                "model1": True,
+                "model2": self.career_predictor.model_loaded,
+                "model3": self.role_predictor.model_loaded
+            },
+            "model2_cache": cache_stats
+        }
+
+    def score_responses(self, payload):
+        return score_assessment(payload)
+
+    def predict_cluster(self, payload):
+        if self.cluster_batcher is None:
+            return self.career_predictor.predict_career(payload)
+        return self.cluster_batcher.submit_threadsafe(payload)
+
+    def predict_cluster_group(self, payloads):
+        """Answer a micro-batch of /model2 requests"""
+        if len(payloads) == 1:
+            return [self.career_predictor.predict_career(payloads[0])]
+        
+        results = self.career_predictor.predict_batch(payloads)
+        # predict_batch fails as a whole (e.g. an unknown category under the
+        # 'error' policy); never let one bad request fail its neighbours
+        if not any(result.get('success') for result in results):
+            results = [self.career_predictor.predict_career(payload) for payload in payloads]
+        return results
+
+    def predict_cluster_batch(self, payload):
+        return {"success": True, "results": self.career_predictor.predict_batch(payload.get('users', []))}
+
+    def recommend_roles(self, payload):
+        return self.role_predictor.predict_from_input(payload, encoded=True)
+
+    def recommend_roles_batch(self, payload):
+        return {"success": True, "results": self.role_predictor.predict_batch(payload.get('queries', []))}
+
+    def search_roles(self, payload):
+        return self.role_predictor.search_from_input(payload, encoded=True)
+
+    def run_pipeline(self, payload):
+        return self.pipeline.run(payload)
+
+    def handle(self, path, payload):
+        """Dispatch a request, returning (http_status, result_dict or pre-encoded JSON bytes)"""
+        handler = self.routes.get(path)
+        if handler is None:
+            return 404, {"success": False, "error": f"Unknown endpoint: {path}"}
+
+        try:
+            return 200, handler(payload)
+        except Exception as e:
+            return 500, {"success": False, "error": str(e)}
+
+
+def combine_cache_stats(stats):
+    """Sum the workers' separate Model 2 caches into one stats dict"""
+    stats = [cache for cache in stats if cache is not None]
+    if not stats:
+        return None
+    combined = {key: sum(cache[key] for cache in stats) for key in ('size', 'max_size', 'hits', 'misses')}
+    lookups = combined['hits'] + combined['misses']
+    combined['hit_rate'] = round(combined['hits'] / lookups, 4) if lookups else None
+    combined['model_version'] = stats[0]['model_version']
+    return combined
+
+
+class ModelHTTPServer(ThreadingHTTPServer):
+    request_queue_size = LISTEN_BACKLOG
+    daemon_threads = True
+
+
+class ModelRequestHandler(BaseHTTPRequestHandler):
+    service = None
+    # Set when POST requests are answered by pre-forked workers
+    pool = None
+
+    def _send_json(self, status, result):
+        body = result if isinstance(result, bytes) else json.dumps(result, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # In pool mode the caches and model timings live in the workers
+        if self.path == '/health':
+            if self.pool is None:
+                health = self.service.health()
+            else:
+                worker_stats = self.pool.collect_stats()
+                health = self.service.health(worker_stats)
+                health['worker_pool'] = {**self.pool.stats(), 'reporting': len(worker_stats)}
+            self._send_json(200, health)
+        elif self.path == '/metrics':
+            snapshot = metrics.snapshot()
+            if self.pool is not None:
+                snapshot = merge_snapshots([snapshot] + [stats['metrics'] for stats in self.pool.collect_stats()])
+            self._send_json(200, snapshot)
+        else:
+            self._send_json(404, {"success": False, "error": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        # /model3/batch is reported as model3.batch
+        name = self.path.strip('/').replace('/', '.') or 'root'
+        with metrics.request(name):
+            try:
+                with metrics.stage('parse'):
+                    length = int(self.headers.get('Content-Length', 0))
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError as e:
+                self._send_json(400, {"success": False, "error": f"Invalid JSON: {e}"})
+                return
+
+            if self.pool is not None:
+                status, result = self.pool.submit(self.path, payload)
+            else:
+                status, result = self.service.handle(self.path, payload)
+            # Handlers report failures in the result rather than raising;
+            # pre-encoded results are always successful responses
+            if status != 200 or (isinstance(result, dict) and not result.get('success', True)):
+                metrics.increment(f'{name}.failures')
+            with metrics.stage('serialize'):
+                self._send_json(status, result)
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"[Model Server] {self.address_string()} {format % args}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Model 1, 2 and 3 from a single warm process")
+    parser.add_argument('--host', default=os.environ.get('ML_MODEL_SERVER_HOST', DEFAULT_HOST))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('ML_MODEL_SERVER_PORT', DEFAULT_PORT)))
+    parser.add_argument('--batch-window-ms', type=float,
+                        default=float(os.environ.get('ML_MODEL_BATCH_WINDOW_MS', DEFAULT_MAX_WAIT_MS)),
+                        help="how long Model 2 requests wait for others to batch with (0 disables)")
+    parser.add_argument('--max-batch-size', type=int,
+                        default=int(os.environ.get('ML_MODEL_MAX_BATCH_SIZE', DEFAULT_MAX_BATCH_SIZE)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('ML_MODEL_WORKERS', 0)),
+                        help="pre-forked worker processes (0 answers requests in this process); "
+                             "workers predict Model 2 requests one by one instead of micro-batching")
+    parser.add_argument('--max-queue', type=int, default=int(os.environ.get('ML_MODEL_MAX_QUEUE', DEFAULT_MAX_QUEUE)),
+                        help="jobs waiting for a worker before new requests get 503")
+    parser.add_argument('--job-timeout', type=float,
+                        default=float(os.environ.get('ML_MODEL_JOB_TIMEOUT', DEFAULT_JOB_TIMEOUT)),
+                        help="seconds before a job fails with 504 and its worker is replaced")
+    args = parser.parse_args()
+
+    # The batcher's event loop thread would not survive the fork into workers
+    batch_window_ms = 0 if args.workers > 0 else args.batch_window_ms
+    with metrics.timer('model_server.load'):
+        service = ModelService(batch_window_ms, args.max_batch_size)
+    ModelRequestHandler.service = service
+
+    if args.workers > 0:
+        # Fork before the HTTP server starts any threads
+        ModelRequestHandler.pool = WorkerPool(
+            service.handle, args.workers, args.max_queue, args.job_timeout, after_fork=service.after_fork,
+            stats=service.worker_stats
+        ).start()
+        print(f"[Model Server] Started {args.workers} model workers", file=sys.stderr)
+
+    server = ModelHTTPServer((args.host, args.port), ModelRequestHandler)
+    print(f"[Model Server] Listening on http://{args.host}:{args.port}", file=sys.stderr)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if ModelRequestHandler.pool is not None:
+            ModelRequestHandler.pool.close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
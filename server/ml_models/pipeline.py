@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Assessment Pipeline
+Runs Model 1 (response scoring), Model 2 (career cluster) and Model 3
+(career roles) in one process, passing results between them in memory
+
+Each step is fed exactly what the Node /predict route feeds the separate
+scripts, so the combined result matches the three-process chain.
+
+Usage: python pipeline.py < request.json
+    {"responses": [...], "education_level": "Foundation", "username": "...",
+     "profile": {"age": 17, "gender": "Female", "educationLevel": "12th",
+                 "interests": "Programming", "personalityType": "Ambivert"}}
+"""
+
+import json
+import math
+import os
+import sys
+
+ML_MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
+for model_dir in ('model1', 'model2', 'model3'):
+    sys.path.insert(0, os.path.join(ML_MODELS_DIR, model_dir))
+
+from model1_scoring_engine import score_assessment
+from model2_cluster_predictor import CareerPredictor
+from model3_career_role_predictor import CareerRolePredictor
+from instrumentation import metrics
+
+
+def js_round(value):
+    """Math.round from JavaScript: halves round up, not to even"""
+    return math.floor(value + 0.5)
+
+
+def assessment_scores(model1_result):
+    """Percent scores the Node route stores in user.assessmentResults"""
+    return {
+        'cognitiveScore': js_round((model1_result.get('cognitive_score') or 0) * 100),
+        'skillsScore': js_round((model1_result.get('skills_score') or 0) * 100),
+        'situationalScore': js_round((model1_result.get('situational_score') or 0) * 100),
+        'valuesScore': js_round((model1_result.get('values_score') or 0) * 100),
+        'personalityScore': model1_result.get('personality_score') or 50
+    }
+
+
+def model2_input(profile, scores):
+    """Model 2 request built from the user profile, with the Node route's defaults"""
+    interests = profile.get('interests')
+    if isinstance(interests, list):
+        interests = interests[0] if interests else None
+
+    return {
+        'age': profile.get('age') or 25,
+        'gender': profile.get('gender') or 'Female',
+        'educationLevel': profile.get('educationLevel') or 'bachelors',
+        'interests': interests or 'Programming',
+        'personalityType': profile.get('personalityType') or 'Ambivert',
+        'personalityScore': scores['personalityScore'] or 75,
+        'cognitiveScore': scores['cognitiveScore'] or 80,
+        'skillsScore': scores['skillsScore'] or 80,
+        'situationalScore': scores['situationalScore'] or 75,
+        'valuesScore': scores['valuesScore'] or 75
+    }
+
+
+class AssessmentPipeline:
+    def __init__(self, career_predictor=None, role_predictor=None):
+        """Use already loaded predictors when given, otherwise load them once here"""
+        self.career_predictor = career_predictor or CareerPredictor(model_path=os.path.join(ML_MODELS_DIR, 'model2'))
+        self.role_predictor = role_predictor or CareerRolePredictor()
+
+    def run(self, payload):
+        """Score responses, predict the career cluster and recommend roles
+
+        Returns the three model results plus the derived percent scores.
+        Model 3 is skipped (None) when Model 2 has no prediction.
+        """
+        try:
+            model1_result = score_assessment(payload)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+        scores = assessment_scores(model1_result)
+        model2_result = self.career_predictor.predict_career(model2_input(payload.get('profile') or {}, scores))
+
+        model3_result = None
+        if model2_result.get('success') and model2_result.get('prediction'):
+            model3_result = self.role_predictor.predict_from_input({'careerCluster': model2_result['prediction']})
+
+        return {
+            "success": True,
+            "model1": model1_result,
+            "assessment_scores": scores,
+            "model2": model2_result,
+            "model3": model3_result
+        }
+
+
+def main():
+    try:
+        with metrics.request('pipeline'):
+            with metrics.stage('parse'):
+                input_data = sys.stdin.read().strip()
+                if not input_data:
+                    raise ValueError("No input data received")
+                payload = json.loads(input_data)
+
+            # Prefer the warm model server when one is configured
+            from model_client import call_model_server
+
+            with metrics.stage('forward'):
+                result = call_model_server('/pipeline', payload)
+            if result is None:
+                result = AssessmentPipeline().run(payload)
+
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
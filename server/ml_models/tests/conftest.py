@@ -0,0 +1,28 @@
+"""
+Shared setup for the model tests: the model modules import each other by
+bare name, the way the model server puts them on sys.path
+
+Run from server/ml_models with: python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+ML_MODELS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASETS_DIR = os.path.join(ML_MODELS_DIR, 'datasets')
+
+sys.path.insert(0, ML_MODELS_DIR)
+for model_dir in ('model1', 'model2', 'model3'):
+    sys.path.insert(0, os.path.join(ML_MODELS_DIR, model_dir))
+
+
+@pytest.fixture(scope='session')
+def datasets_dir():
+    return DATASETS_DIR
+
+
+@pytest.fixture(scope='session')
+def ml_models_dir():
+    return ML_MODELS_DIR
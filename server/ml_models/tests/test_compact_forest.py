@@ -0,0 +1,77 @@
+"""The compact forest must reproduce RandomForestClassifier.predict_proba bit for bit"""
+
+import csv
+import hashlib
+import os
+
+import numpy as np
+import pytest
+
+from compact_forest import CompactForest, export_forest
+from model2_cluster_predictor import CATEGORICAL_COLUMNS, MODEL_FILE
+
+# Unpickling across scikit-learn versions and unnamed feature arrays only warn
+pytestmark = pytest.mark.filterwarnings('ignore::UserWarning')
+
+
+@pytest.fixture(scope='module')
+def forests(ml_models_dir, tmp_path_factory):
+    """The pickled forest and its compact export, written to a scratch directory"""
+    joblib = pytest.importorskip('joblib')
+
+    model_dir = os.path.join(ml_models_dir, 'model2')
+    with open(os.path.join(model_dir, MODEL_FILE), 'rb') as f:
+        model_sha256 = hashlib.sha256(f.read()).hexdigest()
+    model = joblib.load(os.path.join(model_dir, MODEL_FILE))
+    label_encoders = joblib.load(os.path.join(model_dir, 'label_encoders.pkl'))
+    feature_names = joblib.load(os.path.join(model_dir, 'feature_names.pkl'))
+    label_classes = {column: label_encoders[column].classes_ for column in CATEGORICAL_COLUMNS}
+
+    forest_dir = str(tmp_path_factory.mktemp('forest'))
+    export_forest(model, feature_names, label_classes, model_sha256, forest_dir)
+    compact = CompactForest.load(forest_dir, model_sha256)
+    assert compact is not None
+    return model, compact, feature_names, label_classes
+
+
+@pytest.fixture(scope='module')
+def profiles(forests, datasets_dir):
+    """Feature matrix of the user profiles in the Model 2 training CSV"""
+    _, _, feature_names, label_classes = forests
+    codes = {column: {value: code for code, value in enumerate(classes)} for column, classes in label_classes.items()}
+
+    with open(os.path.join(datasets_dir, 'DS2_Career_Cluster_Prediction.csv'), newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    return np.array([
+        [codes[name].get(row[name], 0) if name in codes else float(row[name]) for name in feature_names]
+        for row in rows
+    ], dtype=np.float64)
+
+
+def test_predict_proba_matches_on_training_profiles(forests, profiles):
+    model, compact, _, _ = forests
+    assert np.array_equal(compact.predict_proba(profiles), model.predict_proba(profiles))
+    assert np.array_equal(compact.classes_, model.classes_)
+
+
+def test_predict_proba_matches_at_split_thresholds(forests, profiles):
+    """Features exactly on, and one float step either side of, every split threshold"""
+    model, compact, _, _ = forests
+    splits = {
+        (int(feature), float(threshold))
+        for estimator in model.estimators_
+        for feature, threshold in zip(estimator.tree_.feature, estimator.tree_.threshold)
+        if feature >= 0
+    }
+
+    rows = []
+    for i, (feature, threshold) in enumerate(sorted(splits)):
+        base = profiles[i % len(profiles)]
+        for value in (threshold, np.nextafter(threshold, -np.inf), np.nextafter(threshold, np.inf),
+                      float(np.float32(threshold))):
+            row = base.copy()
+            row[feature] = value
+            rows.append(row)
+    X = np.array(rows)
+
+    assert np.array_equal(compact.predict_proba(X), model.predict_proba(X))
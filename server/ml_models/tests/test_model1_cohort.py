@@ -0,0 +1,65 @@
+"""score_cohort must give exactly what one Model1ScoringEngine per user gives"""
+
+import os
+import random
+
+from model1_scoring_engine import Model1ScoringEngine, iter_user_responses, score_cohort
+
+RESPONSE_FILES = ('Foundation_User_Responses.csv', 'Intermediate_User_Responses.csv', 'Advanced_User_Responses.csv')
+LEVEL_PREFIXES = {'Foundation': 'F', 'Intermediate': 'I', 'Advanced': 'A', 'Unknown': 'I'}
+ANSWERS = (
+    '1', '2', '3', '4', '5', 'Strongly Agree', 'Agree', 'Neutral', 'Disagree', 'Strongly Disagree',
+    'A', 'B', 'C', 'D', 'E', 'F', '', ' B ', 'x'
+)
+
+
+def score_one_by_one(users):
+    return [
+        Model1ScoringEngine().process_responses(user['responses'], user['education_level'], user['username'])
+        for user in users
+    ]
+
+
+def random_users(count, seed=7):
+    """Users with unknown levels, malformed question ids and odd answers mixed in"""
+    rng = random.Random(seed)
+    users = []
+    for i in range(count):
+        level = rng.choice(list(LEVEL_PREFIXES))
+        responses = []
+        for _ in range(rng.randint(0, 70)):
+            question_id = f"{LEVEL_PREFIXES[level]}{rng.choice('PSCTVX')}{rng.randint(1, 21):03d}"
+            if rng.random() < 0.2:
+                question_id = question_id[0] + '_' + question_id[1:]
+            responses.append({'Question_ID': question_id, 'Answer': rng.choice(ANSWERS)})
+        if rng.random() < 0.1:
+            responses.append({'Question_ID': '', 'Answer': 'A'})
+        if rng.random() < 0.1:
+            responses.append({'Answer': 'A'})
+        users.append({'responses': responses, 'education_level': level, 'username': f'user{i}'})
+    return users
+
+
+def test_cohort_matches_per_user_scoring_on_the_response_exports(datasets_dir):
+    users = [
+        {'responses': responses, 'education_level': education_level, 'username': username}
+        for username, education_level, responses in iter_user_responses(
+            [os.path.join(datasets_dir, file_name) for file_name in RESPONSE_FILES]
+        )
+    ]
+    assert users
+    assert score_cohort(users) == score_one_by_one(users)
+
+
+def test_cohort_matches_per_user_scoring_on_malformed_input():
+    users = random_users(400)
+    assert score_cohort(users) == score_one_by_one(users)
+
+
+def test_cohort_matches_per_user_scoring_on_numeric_answers():
+    """Non-string answers send their chunk through the user-by-user read"""
+    users = random_users(60, seed=11)
+    for user in users[::3]:
+        for i, response in enumerate(user['responses'][::4]):
+            response['Answer'] = i % 5 + 1
+    assert score_cohort(users) == score_one_by_one(users)
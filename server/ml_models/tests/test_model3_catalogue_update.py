@@ -0,0 +1,124 @@
+"""An incremental catalogue update must serve exactly what recomputing
+every score and index structure from the updated catalogue would
+
+Both sides share the fitted vectorizer, scaler and label encoders: those
+are frozen between full retrains by design, so a refit is not the
+reference.
+"""
+
+import copy
+import json
+
+import numpy as np
+import pytest
+
+from model3_career_role_predictor import COLLAB_FEATURES, CSV_COLUMNS, SERVING_ARRAYS, CareerRolePredictor
+
+# Every array requests are answered from, besides those saved as SERVING_ARRAYS
+INDEX_ARRAYS = ('skill_offsets', 'skill_roles', 'skill_weights')
+SEARCH_QUERIES = ('python machine learning', 'cloud computing programming', 'accounting finance', 'teaching')
+
+pytestmark = pytest.mark.filterwarnings('ignore::UserWarning')
+
+
+@pytest.fixture(scope='module')
+def artifacts_dir(tmp_path_factory):
+    """A model trained from the repository CSV into a scratch artifacts directory"""
+    artifacts_dir = str(tmp_path_factory.mktemp('model3_artifacts'))
+    predictor = CareerRolePredictor(artifacts_dir=artifacts_dir, rebuild=True)
+    assert predictor.model_loaded and predictor.manifest is not None
+    return artifacts_dir
+
+
+@pytest.fixture
+def predictor(artifacts_dir):
+    predictor = CareerRolePredictor(artifacts_dir=artifacts_dir)
+    assert predictor.load_training_state()
+    return predictor
+
+
+def catalogue_role(predictor, career_cluster, nth, **changes):
+    """The nth role of a cluster as an update dict, with changes applied"""
+    row = predictor.df[predictor.df['Career_Cluster'] == career_cluster].iloc[nth]
+    return {**{column: row[column] for column in CSV_COLUMNS.values()}, **changes}
+
+
+def role_key(role):
+    return role['Career_Cluster'], role['Career_Role']
+
+
+def recomputed(predictor):
+    """A copy of the predictor with every score recomputed from its current catalogue"""
+    from sklearn.preprocessing import normalize
+
+    reference = copy.copy(predictor)
+    reference.knn_model = copy.deepcopy(predictor.knn_model)
+    reference.df = predictor.prepare_role_features(predictor.df[list(CSV_COLUMNS.values())])
+    reference.skills_tfidf_matrix = normalize(predictor.tfidf_vectorizer.transform(reference.df['Skills_Text']))
+    reference.skill_term_counts = predictor.count_skill_terms(reference.df['Skills_Text'])
+    reference.content_scores = reference.compute_content_scores()
+
+    collab_features_scaled = predictor.scaler.transform(reference.df[COLLAB_FEATURES].values)
+    reference.knn_model.fit(collab_features_scaled)
+    reference.collab_scores, reference.collab_radii = reference.compute_collaborative_scores(collab_features_scaled)
+
+    reference.build_ranking_index()
+    return reference
+
+
+def delta_mixed(predictor):
+    edited = catalogue_role(
+        predictor, 'IT', 0, Required_Skills='Python; Machine Learning; Data Analysis', Avg_Salary_Range='30-60 LPA'
+    )
+    added = catalogue_role(
+        predictor, 'IT', 1, Career_Role='Cloud Platform Developer',
+        Required_Skills='Programming; Problem Solving; Cloud Computing'
+    )
+    deleted = role_key(catalogue_role(predictor, 'Finance', 1))
+    return [edited, added], [deleted]
+
+
+def delta_insert(predictor):
+    return [catalogue_role(predictor, 'Healthcare', 2, Career_Role='Clinical Data Analyst', Avg_Salary_Range='8-20 LPA')], []
+
+
+def delta_delete(predictor):
+    return [], [role_key(catalogue_role(predictor, 'Design', 0)), role_key(catalogue_role(predictor, 'STEM', 3))]
+
+
+@pytest.mark.parametrize('delta', [delta_mixed, delta_insert, delta_delete], ids=['mixed', 'insert', 'delete'])
+def test_incremental_update_matches_a_full_recompute(predictor, delta):
+    upserts, deletes = delta(predictor)
+    summary = predictor.update_roles(upserts, deletes)
+    assert summary['mode'] == 'incremental'
+    assert summary['recomputed_roles'] < len(predictor.df)
+
+    roles = set(predictor.df[['Career_Cluster', 'Career_Role']].itertuples(index=False, name=None))
+    assert {role_key(role) for role in upserts} <= roles
+    assert not set(deletes) & roles
+
+    reference = recomputed(predictor)
+
+    assert (predictor.skills_tfidf_matrix != reference.skills_tfidf_matrix).nnz == 0
+    assert predictor.skill_term_counts == reference.skill_term_counts
+    for name in ('content_scores', 'collab_scores', 'collab_radii', *SERVING_ARRAYS, *INDEX_ARRAYS):
+        assert np.array_equal(getattr(predictor, name), getattr(reference, name)), name
+    assert predictor.serving_index == reference.serving_index
+
+    for career_cluster in predictor.serving_index['clusters']:
+        assert predictor.predict_career_roles(career_cluster, top_n=10, encoded=True) == \
+            reference.predict_career_roles(career_cluster, top_n=10, encoded=True)
+    for query in SEARCH_QUERIES:
+        assert predictor.search_roles(query, encoded=True) == reference.search_roles(query, encoded=True)
+
+
+def test_updated_artifacts_serve_the_update(predictor, artifacts_dir):
+    """Saved after an update, the serving artifacts answer like the updated model"""
+    predictor.update_roles(*delta_mixed(predictor))
+    assert predictor.save_artifacts() is not None
+
+    reloaded = CareerRolePredictor(artifacts_dir=artifacts_dir)
+    assert reloaded.df is None, "expected the serving index, not the bundle"
+    for career_cluster in predictor.serving_index['clusters']:
+        response = json.loads(reloaded.predict_career_roles(career_cluster, top_n=10, encoded=True))
+        assert response == predictor.predict_career_roles(career_cluster, top_n=10)
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Worker Pool
+Pre-forked model worker processes behind a bounded job queue
+
+The parent loads the models once and forks the workers afterwards, so they
+share the loaded pages copy-on-write (and the memory-mapped artifacts
+outright). Jobs beyond the queue bound are rejected straight away instead
+of piling up, and a job that outlives its timeout gets its worker killed
+and replaced so one stuck request cannot hold a worker forever.
+
+Workers are never forked from the parent directly: once the HTTP and
+dispatcher threads run, a fork could copy a lock some other thread holds
+into the child, where it stays locked forever. Instead a zygote process,
+forked while the parent is still single-threaded, forks every worker
+(replacements included) from its own clean copy of the loaded models.
+"""
+
+import multiprocessing
+import multiprocessing.connection
+import multiprocessing.reduction
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+from instrumentation import metrics
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_MAX_QUEUE = 64
+# Below model_client's 30s so the caller gets the timeout response, not its own;
+# counted from when the job is queued, so time spent waiting is included
+DEFAULT_JOB_TIMEOUT = 20
+# How long close() gives workers to finish their current job
+SHUTDOWN_GRACE = 5
+# Sent instead of a job to ask a worker for its stats
+STATS_REQUEST = 'stats'
+# How long collect_stats() waits on each worker; a busy one is left out
+STATS_TIMEOUT = 1
+
+
+class PoolJob:
+    def __init__(self, path, payload, timeout):
+        self.path = path
+        self.payload = payload
+        self.result = None
+        self.enqueued_at = time.perf_counter()
+        self.deadline = self.enqueued_at + timeout
+        # Set once the caller has stopped waiting; a queued job is then skipped
+        self.abandoned = False
+        self.done = threading.Event()
+        # The worker's metrics stage timings, merged into the caller's request
+        self.stages = None
+
+    def remaining(self):
+        return self.deadline - time.perf_counter()
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def kill_pid(pid):
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def worker_main(conn, handle, after_fork, stats):
+    """Answer (path, payload) jobs and stats requests from the parent until told to stop"""
+    # Ctrl-C reaches the whole process group; shutdown is the parent's call
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if after_fork is not None:
+        after_fork()
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        if job == STATS_REQUEST:
+            conn.send(stats() if stats is not None else {})
+            continue
+
+        path, payload = job
+        with metrics.collect_stages() as stages:
+            try:
+                result = handle(path, payload)
+            except Exception as e:
+                result = (500, {"success": False, "error": str(e)})
+        conn.send((result, stages))
+
+
+def zygote_main(conn, parent_conn, handle, after_fork, stats):
+    """Fork a worker for every pipe end the parent passes over, replying with its pid"""
+    # Forked holding the parent's end too; drop it so a dead parent reads as EOF
+    parent_conn.close()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Workers are reaped as they exit; the parent tracks them by pid
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    while True:
+        try:
+            if conn.recv() is None:
+                break
+            worker_conn = multiprocessing.connection.Connection(multiprocessing.reduction.recv_handle(conn))
+        except (EOFError, OSError):
+            break
+
+        pid = os.fork()
+        if pid == 0:
+            conn.close()
+            # The default SIGCHLD handling again for anything the worker runs
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            status = 0
+            try:
+                worker_main(worker_conn, handle, after_fork, stats)
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+
+        worker_conn.close()
+        conn.send(pid)
+
+
+class WorkerPool:
+    def __init__(self, handle, workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE,
+                 job_timeout=DEFAULT_JOB_TIMEOUT, after_fork=None, stats=None, name='worker_pool'):
+        """handle(path, payload) -> (status, result) runs inside the workers
+
+        after_fork runs in each new worker before its first job, e.g. to
+        replace locks that a parent thread may have held at fork time.
+        stats() -> dict runs inside a worker for collect_stats().
+        """
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("The worker pool needs the 'fork' start method (Linux or macOS)")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        self.handle = handle
+        self.size = workers
+        self.max_queue = max_queue
+        self.job_timeout = job_timeout
+        self.after_fork = after_fork
+        self.worker_stats = stats
+        self.name = name
+        self.context = multiprocessing.get_context('fork')
+        self.jobs = queue.Queue(maxsize=max_queue)
+        self.workers = [None] * workers
+        # Held while a worker's pipe has a request in flight
+        self.slot_locks = [threading.Lock() for _ in range(workers)]
+        self.dispatchers = []
+        self.busy = 0
+        self.lock = threading.Lock()
+        self.zygote = None
+        self.zygote_conn = None
+        self.zygote_lock = threading.Lock()
+
+    def start(self):
+        """Fork the zygote and every worker, then start the dispatcher threads
+
+        Call while the process is still single-threaded: the zygote is the
+        one process forked from the parent itself.
+        """
+        self.zygote_conn, child_conn = self.context.Pipe()
+        self.zygote = self.context.Process(
+            target=zygote_main, args=(child_conn, self.zygote_conn, self.handle, self.after_fork, self.worker_stats),
+            name=f'{self.name}-zygote', daemon=True
+        )
+        self.zygote.start()
+        child_conn.close()
+
+        for slot in range(self.size):
+            self.spawn(slot)
+        for slot in range(self.size):
+            dispatcher = threading.Thread(target=self.dispatch, args=(slot,), name=f'{self.name}-{slot}', daemon=True)
+            dispatcher.start()
+            self.dispatchers.append(dispatcher)
+        return self
+
+    def spawn(self, slot):
+        """Have the zygote fork a worker on a new pipe"""
+        parent_conn, child_conn = self.context.Pipe()
+        with self.zygote_lock:
+            self.zygote_conn.send('spawn')
+            multiprocessing.reduction.send_handle(self.zygote_conn, child_conn.fileno(), self.zygote.pid)
+            pid = self.zygote_conn.recv()
+        child_conn.close()
+        self.workers[slot] = (pid, parent_conn)
+
+    def restart(self, slot):
+        """Replace a slot's worker; the slot is left dead (None) if the zygote cannot fork one"""
+        pid, conn = self.workers[slot]
+        self.workers[slot] = None
+        kill_pid(pid)
+        conn.close()
+        metrics.increment(f'{self.name}.restarts')
+        try:
+            self.spawn(slot)
+        except (EOFError, OSError) as e:
+            metrics.increment(f'{self.name}.spawn_failures')
+            print(f"[Worker Pool] Could not replace worker {slot}: {e}", file=sys.stderr)
+
+    def unavailable_result(self):
+        return 503, {"success": False, "error": "No model workers available"}
+
+    def timeout_result(self):
+        return 504, {"success": False, "error": f"Request timed out after {self.job_timeout}s"}
+
+    def submit(self, path, payload):
+        """Run one job on a worker; returns (http_status, result_dict)
+
+        Answers within job_timeout of the call, however long the job queued.
+        """
+        if all(worker is None for worker in self.workers):
+            return self.unavailable_result()
+
+        job = PoolJob(path, payload, self.job_timeout)
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            metrics.increment(f'{self.name}.rejected')
+            return 503, {"success": False, "error": "Model server is busy, retry shortly"}
+
+        metrics.observe(f'{self.name}.queue_depth', self.jobs.qsize(), unit='count')
+        if not job.done.wait(max(job.remaining(), 0)):
+            # The dispatcher skips the job if it is still queued, or times
+            # out the worker running it at about the same moment
+            job.abandoned = True
+            return self.timeout_result()
+        metrics.add_stages(job.stages)
+        return job.result
+
+    def dispatch(self, slot):
+        """Feed queued jobs to one worker, enforcing the per-job timeout"""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+
+            metrics.observe(f'{self.name}.queue_wait_ms', (time.perf_counter() - job.enqueued_at) * 1000)
+            if job.abandoned or job.remaining() <= 0:
+                # Expired while queued: never worth a worker's time
+                metrics.increment(f'{self.name}.expired')
+                job.result = self.timeout_result()
+                job.done.set()
+                continue
+
+            if self.workers[slot] is None:
+                # Lost its worker for good; answer rather than let the job time out
+                job.result = self.unavailable_result()
+                job.done.set()
+                continue
+
+            with self.lock:
+                self.busy += 1
+
+            with self.slot_locks[slot]:
+                _, conn = self.workers[slot]
+                try:
+                    conn.send((job.path, job.payload))
+                    if conn.poll(max(job.remaining(), 0)):
+                        job.result, job.stages = conn.recv()
+                    else:
+                        metrics.increment(f'{self.name}.timeouts')
+                        job.result = self.timeout_result()
+                        self.restart(slot)
+                except (EOFError, OSError) as e:
+                    metrics.increment(f'{self.name}.crashes')
+                    job.result = (500, {"success": False, "error": f"Model worker failed: {e}"})
+                    self.restart(slot)
+                finally:
+                    with self.lock:
+                        self.busy -= 1
+                    job.done.set()
+
+    def collect_stats(self):
+        """stats() from every worker free within STATS_TIMEOUT; busy ones are left out"""
+        collected = []
+        for slot, slot_lock in enumerate(self.slot_locks):
+            if not slot_lock.acquire(timeout=STATS_TIMEOUT):
+                continue
+            try:
+                if self.workers[slot] is None:
+                    continue
+                _, conn = self.workers[slot]
+                conn.send(STATS_REQUEST)
+                if conn.poll(STATS_TIMEOUT):
+                    collected.append(conn.recv())
+                else:
+                    # A late reply would be read as the next job's result
+                    self.restart(slot)
+            except (EOFError, OSError):
+                self.restart(slot)
+            finally:
+                slot_lock.release()
+        return collected
+
+    def stats(self):
+        return {
+            'workers': self.size,
+            'alive': sum(1 for worker in self.workers if worker is not None and pid_alive(worker[0])),
+            'busy': self.busy,
+            'queue_depth': self.jobs.qsize(),
+            'max_queue': self.max_queue,
+            'job_timeout': self.job_timeout
+        }
+
+    def close(self):
+        """Let in-flight jobs finish, then stop the workers"""
+        deadline = time.perf_counter() + SHUTDOWN_GRACE
+        for _ in self.dispatchers:
+            try:
+                self.jobs.put(None, timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Full:
+                break
+        for dispatcher in self.dispatchers:
+            dispatcher.join(timeout=max(deadline - time.perf_counter(), 0))
+
+        workers = []
+        for slot, worker in enumerate(self.workers):
+            if worker is None:
+                continue
+            workers.append(worker)
+            # A stats request may still be using the pipe
+            locked = self.slot_locks[slot].acquire(timeout=STATS_TIMEOUT)
+            try:
+                worker[1].send(None)
+            except OSError:
+                pass
+            finally:
+                if locked:
+                    self.slot_locks[slot].release()
+
+        deadline = time.perf_counter() + SHUTDOWN_GRACE
+        for pid, conn in workers:
+            while pid_alive(pid) and time.perf_counter() < deadline:
+                time.sleep(0.05)
+            kill_pid(pid)
+            conn.close()
+
+        try:
+            self.zygote_conn.send(None)
+        except OSError:
+            pass
+        self.zygote.join(timeout=SHUTDOWN_GRACE)
+        if self.zygote.is_alive():
+            self.zygote.kill()
+        self.zygote_conn.close()
@@ -105,10 +105,24 @@ const { spawn } = require('child_process');
 const path = require('path');
 const User = require('../models/User');
 const TestResponse = require('../models/TestResponse');
+const { callModelServer, ModelServerBusyError } = require('../services/modelServerClient');
 // const Assessment = require('../models/Assessment');
 
 // Enhanced Model 1 function that calls Python script
-const runModel1Enhanced = (responses, educationLevel, username) => {
+const runModel1Enhanced = async (responses, educationLevel, username) => {
+  const inputData = {
+    responses: responses,
+    education_level: educationLevel,
+    username: username
+  };
+
+  // Use the warm model server when available
+  const servedResult = await callModelServer('/model1', inputData);
+  if (servedResult) {
+    console.log('Model 1 Enhanced completed by model server');
+    return servedResult;
+  }
+
   return new Promise((resolve, reject) => {
     const pythonScript = path.join(__dirname, '../ml_models/model1/model1_scoring_engine.py');
     console.log('Starting Model 1 Enhanced Processing...');
@@ -119,12 +133,6 @@ const runModel1Enhanced = (responses, educationLevel, username) => {
     });
     console.log('Python script path:', pythonScript);
 
-    const inputData = {
-      responses: responses,
-      education_level: educationLevel,
-      username: username
-    };
-
     const jsonInput = JSON.stringify(inputData);
     console.log('Sending to Python:', jsonInput.substring(0, 200) + '...');
 
@@ -348,9 +356,24 @@ router.post('/predict', async (req, res) => {
             });
 
             try {
+                // The warm model server can run Model 1 -> 2 -> 3 in one call
+                const pipelineResult = await callModelServer('/pipeline', {
+                    responses: formattedResponses,
+                    education_level: mappedEducationLevel,
+                    username: user.name,
+                    profile: {
+                        age: user.age,
+                        gender: user.gender,
+                        educationLevel: user.educationLevel,
+                        interests: user.interests,
+                        personalityType: user.personalityType
+                    }
+                });
+                const pipelineResults = pipelineResult && pipelineResult.success ? pipelineResult : {};
+
                 console.log('Calling Python Model 1...');
                 
-                const model1Result = await runModel1Enhanced(formattedResponses, mappedEducationLevel, user.name);
+                const model1Result = pipelineResults.model1 || await runModel1Enhanced(formattedResponses, mappedEducationLevel, user.name);
                 
                 console.log('Model 1 completed successfully');
                 console.log('Python model1Result keys:', Object.keys(model1Result));
@@ -432,7 +455,7 @@ router.post('/predict', async (req, res) => {
                     console.log('Model 2 input data:', model2InputData);
                     
                     // Call Model 2 SYNCHRONOUSLY using Promise wrapper
-                    const model2Result = await new Promise((resolve, reject) => {
+                    const model2Result = pipelineResults.model2 || await callModelServer('/model2', model2InputData) || await new Promise((resolve, reject) => {
                         const pythonScriptPath = path.join(__dirname, '../ml_models', 'model2', 'model2_cluster_predictor.py');
                         const model2Process = spawn('python', [pythonScriptPath, JSON.stringify(model2InputData)]);
                         
@@ -566,7 +589,7 @@ router.post('/predict', async (req, res) => {
                         console.log('Model 3 input data:', model3InputData);
                         
                         // Call Model 3 SYNCHRONOUSLY using Promise wrapper
-                        const model3Result = await new Promise((resolve, reject) => {
+                        const model3Result = pipelineResults.model3 || await callModelServer('/model3', model3InputData) || await new Promise((resolve, reject) => {
                             const pythonScriptPath = path.join(__dirname, '../ml_models', 'model3', 'model3_career_role_predictor.py');
                             const model3Process = spawn('python', [pythonScriptPath, JSON.stringify(model3InputData)]);
 
@@ -772,10 +795,13 @@ router.post('/predict', async (req, res) => {
 
                         
                     } catch (model3Error) {
+                        // A busy model server is reported to the client, not skipped
+                        if (model3Error instanceof ModelServerBusyError) throw model3Error;
                         console.error('Model 3 call failed:', model3Error.message);
                     }
                     
                 } catch (model2Error) {
+                    if (model2Error instanceof ModelServerBusyError) throw model2Error;
                     console.error('Model 2 call failed:', model2Error.message);
                 }
 
@@ -835,6 +861,13 @@ router.post('/predict', async (req, res) => {
             } catch (pythonError) {
                 console.error('Python Model 1 failed:', pythonError.message);
                 
+                if (pythonError instanceof ModelServerBusyError) {
+                    return res.status(503).json({
+                        success: false,
+                        error: 'Assessment models are busy, please retry shortly',
+                        retryable: true
+                    });
+                }
                 return res.status(500).json({
                     success: false,
                     error: 'Model 1 processing failed',
@@ -1039,7 +1072,7 @@ router.get('/career-recommendations/:userId', async (req, res) => {
       };
       
       // Call Model 3 Python script
-      const model3Result = await new Promise((resolve) => {
+      const model3Result = await callModelServer('/model3', model3InputData) || await new Promise((resolve) => {
         const pythonScriptPath = path.join(__dirname, '../ml_models', 'model3', 'model3_career_role_predictor.py');
         const model3Process = spawn('python', [pythonScriptPath, JSON.stringify(model3InputData)]);
         
@@ -1133,6 +1166,13 @@ router.get('/career-recommendations/:userId', async (req, res) => {
     
   } catch (error) {
     console.error('Career recommendations error:', error);
+    if (error instanceof ModelServerBusyError) {
+      return res.status(503).json({
+        success: false,
+        message: 'Career role model is busy, please retry shortly',
+        retryable: true
+      });
+    }
     res.status(500).json({
       success: false,
       message: 'Server error getting career recommendations',
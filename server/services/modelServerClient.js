@@ -0,0 +1,111 @@
+const http = require('http');
+
+// Warm Python model server (server/ml_models/model_server.py).
+// Set ML_MODEL_SERVER_URL, e.g. http://127.0.0.1:5005, to enable it.
+const MODEL_SERVER_TIMEOUT_MS = 30000;
+// A busy server (503 queue full, 504 job timed out) is retried a few times
+// with exponential backoff; it is never answered by spawning Python instead,
+// which would turn an overloaded server into unbounded process spawning
+const MODEL_SERVER_BUSY_STATUSES = [503, 504];
+const MODEL_SERVER_BUSY_RETRIES = 2;
+const MODEL_SERVER_RETRY_DELAY_MS = 250;
+
+class ModelServerError extends Error {
+  constructor(message, statusCode = 500) {
+    super(message);
+    this.name = 'ModelServerError';
+    this.statusCode = statusCode;
+  }
+}
+
+// The server stayed busy through every retry; callers should answer 503
+class ModelServerBusyError extends ModelServerError {
+  constructor(endpoint, statusCode) {
+    super(`Model server is busy (${endpoint} returned ${statusCode}), please retry shortly`, 503);
+    this.name = 'ModelServerBusyError';
+  }
+}
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// One POST; resolves with { statusCode, data }, or null when the server
+// cannot be reached at all
+const postOnce = (serverUrl, endpoint, body) => new Promise((resolve, reject) => {
+  let timedOut = false;
+  const request = http.request(new URL(endpoint, serverUrl), {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Content-Length': Buffer.byteLength(body)
+    },
+    timeout: MODEL_SERVER_TIMEOUT_MS
+  }, (response) => {
+    let data = '';
+    response.setEncoding('utf8');
+    response.on('data', (chunk) => {
+      data += chunk;
+    });
+    response.on('end', () => {
+      resolve({ statusCode: response.statusCode, data });
+    });
+  });
+
+  request.on('timeout', () => {
+    timedOut = true;
+    request.destroy(new Error('Model server timeout'));
+  });
+
+  request.on('error', (error) => {
+    if (timedOut) {
+      // Reached but not answering in time: overloaded, not down
+      return reject(new ModelServerBusyError(endpoint, 504));
+    }
+    console.log(`Model server ${endpoint} unavailable, falling back to Python script:`, error.message);
+    resolve(null);
+  });
+
+  request.write(body);
+  request.end();
+});
+
+// POST a JSON payload to the model server.
+// Resolves with the parsed result, or null when the server is not configured
+// or cannot be reached so callers can fall back to spawning the Python script.
+// Rejects with ModelServerBusyError when it stays busy, and with
+// ModelServerError for any other failed response.
+const callModelServer = async (endpoint, payload) => {
+  const serverUrl = process.env.ML_MODEL_SERVER_URL;
+
+  if (!serverUrl) {
+    return null;
+  }
+
+  const body = JSON.stringify(payload);
+  for (let attempt = 0; ; attempt++) {
+    const response = await postOnce(serverUrl, endpoint, body);
+    if (response === null) {
+      return null;
+    }
+
+    if (MODEL_SERVER_BUSY_STATUSES.includes(response.statusCode)) {
+      if (attempt >= MODEL_SERVER_BUSY_RETRIES) {
+        throw new ModelServerBusyError(endpoint, response.statusCode);
+      }
+      const delay = MODEL_SERVER_RETRY_DELAY_MS * 2 ** attempt;
+      console.log(`Model server ${endpoint} busy (${response.statusCode}), retrying in ${delay}ms`);
+      await sleep(delay + Math.random() * delay);
+      continue;
+    }
+
+    if (response.statusCode !== 200) {
+      throw new ModelServerError(`Model server ${endpoint} returned ${response.statusCode}`);
+    }
+    try {
+      return JSON.parse(response.data);
+    } catch (parseError) {
+      throw new ModelServerError(`Model server ${endpoint} returned invalid JSON: ${parseError.message}`);
+    }
+  }
+};
+
+module.exports = { callModelServer, ModelServerError, ModelServerBusyError };